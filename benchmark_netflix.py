@@ -0,0 +1,199 @@
+# BENCHMARK DO PIPELINE NETFLIX MAPREDUCE
+# Gera catálogos sintéticos no formato do netflix_titles.csv (10k a 10M
+# linhas), mede cada etapa do pipeline e grava os resultados em JSON para
+# comparar execuções ao longo do tempo
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico vem do tracemalloc
+    resource = None
+
+import netflix_analysis as na
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_MODES = ['fused', 'vectorized']
+STAGES = ['load', 'analysis', 'recommendations', 'charts']
+
+def generate_catalog(source_csv, rows, output_csv, seed=42, chunksize=500_000):
+    # Catálogo sintético amostrado do dataset real. (type, listed_in, country,
+    # rating, duration) são sorteados juntos para manter as distribuições
+    # multivaloradas de gêneros e países por tipo; as demais colunas são
+    # sorteadas de forma independente.
+    # A escrita é feita em chunks para não manter 10M linhas em memória
+    source = pd.read_csv(source_csv)
+    rng = np.random.default_rng(seed)
+    joint = ['type', 'listed_in', 'country', 'rating', 'duration']
+    independent = ['director', 'cast', 'date_added', 'release_year', 'description']
+
+    for start in range(0, rows, chunksize):
+        size = min(chunksize, rows - start)
+        chunk = source[joint].iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+        for column in independent:
+            chunk[column] = source[column].iloc[rng.integers(0, len(source), size)].to_numpy()
+        ids = np.arange(start + 1, start + size + 1).astype(str)
+        chunk.insert(0, 'show_id', np.char.add('s', ids))
+        chunk.insert(2, 'title', np.char.add('Synthetic Title ', ids))
+        chunk = chunk[source.columns]
+        chunk.to_csv(output_csv, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return output_csv
+
+def peak_rss_mb():
+    # Pico de memória residente do processo até agora (ru_maxrss é KB no Linux, bytes no macOS).
+    # Sem o módulo resource, usa o pico de alocações Python rastreado pelo tracemalloc
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def timed(stages, name, rows, function):
+    # Executa uma etapa silenciando o stdout e registra tempo, CPU e memória
+    wall, cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = function()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    stages[name] = {
+        'seconds': round(wall, 4),
+        'cpu_seconds': round(cpu, 4),
+        'rows_per_second': round(rows / wall, 1) if wall > 0 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+    return value
+
+def run_pipeline(csv_file, rows, mode, workers=None):
+    # Mede load → análise → recomendações → gráficos para um catálogo e um modo
+    stages = {}
+    streaming = mode.startswith('streaming-')
+    engine_mode = mode.split('-', 1)[1] if streaming else mode
+    analyzer = timed(stages, 'load', rows, lambda: na.NetflixMapReduce(csv_file, streaming=streaming))
+    results = timed(stages, 'analysis', rows, lambda: analyzer.run_analysis(mode=engine_mode, workers=workers))
+
+    def recommend():
+        engine = na.NetflixRecommendationEngine(results, analyzer.load_columns(['type', 'duration']))
+        trends = engine.analyze_trends()
+        serie = engine.create_serie_recommendation(trends)
+        movie = engine.create_movie_recommendation(trends)
+        engine.justify_recommendations(serie, movie, trends)
+    timed(stages, 'recommendations', rows, recommend)
+    # Sem cache de gráficos: cada execução mede a renderização completa
+    renderer = na.ChartRenderer(cache_dir=None)
+    timed(stages, 'charts', rows, lambda: na.NetflixVisualization(results, None, renderer).generate_main_charts())
+    return stages
+
+def _worker(arguments):
+    # Executa um (tamanho, modo) em processo próprio, para que o pico de RSS seja só dele
+    if resource is None:
+        tracemalloc.start()
+    os.chdir(arguments.workdir)
+    stages = run_pipeline(arguments.csv, arguments.rows, arguments.mode, arguments.workers)
+    with open(arguments.output, 'w', encoding='utf-8') as f:
+        json.dump(stages, f)
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def benchmark(arguments, workdir):
+    # Gera os catálogos que faltam e mede cada (tamanho, modo) em subprocesso
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'analyzer_version': na.ANALYZER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': [],
+    }
+
+    print("⏱️ BENCHMARK DO PIPELINE NETFLIX MAPREDUCE")
+    print("=" * 60)
+    for rows in arguments.sizes:
+        csv_file = os.path.join(workdir, f'catalog_{rows}.csv')
+        if not os.path.exists(csv_file):
+            print(f"\n🧪 Gerando catálogo sintético com {rows} linhas...")
+            generate_catalog(arguments.source, rows, csv_file)
+
+        for mode in arguments.modes:
+            output = os.path.join(workdir, f'stages_{rows}_{mode}.json')
+            command = [sys.executable, os.path.abspath(__file__), '--worker', '--csv', csv_file,
+                       '--rows', str(rows), '--mode', mode, '--output', output, '--workdir', workdir]
+            if arguments.workers:
+                command += ['--workers', str(arguments.workers)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"❌ {rows} linhas / {mode}: falhou\n{completed.stderr[-2000:]}")
+                run['results'].append({'rows': rows, 'mode': mode, 'error': completed.stderr[-2000:]})
+                continue
+            with open(output, encoding='utf-8') as f:
+                stages = json.load(f)
+            total = sum(stage['seconds'] for stage in stages.values())
+            run['results'].append({'rows': rows, 'mode': mode, 'total_seconds': round(total, 4), 'stages': stages})
+
+            print(f"\n📊 {rows} linhas / modo {mode}: {total:.2f}s "
+                  f"(pico RSS {max(stage['peak_rss_mb'] for stage in stages.values()):.0f} MB)")
+            for name in STAGES:
+                stage = stages[name]
+                print(f"   {name:<16} {stage['seconds']:>9.3f}s  {stage['rows_per_second'] or 0:>14,.0f} linhas/s")
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline Netflix MapReduce")
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')], default=DEFAULT_SIZES,
+                        help="tamanhos dos catálogos sintéticos (ex.: 10000,100000)")
+    parser.add_argument('--modes', type=lambda value: value.split(','), default=DEFAULT_MODES,
+                        help="modos do run_analysis (classic, fused, vectorized, parallel, streaming-<modo>)")
+    parser.add_argument('--workers', type=int, default=None, help="workers do modo parallel")
+    parser.add_argument('--source', default='netflix_titles.csv', help="CSV real usado como base das amostras")
+    parser.add_argument('--output', default='bench_results.json', help="arquivo JSON onde os resultados são acumulados")
+    parser.add_argument('--workdir', default=None, help="diretório dos catálogos gerados, reaproveitados entre execuções (padrão: temporário, removido ao final)")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--csv', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.worker:
+        return _worker(arguments)
+
+    # Sem --workdir os catálogos (GBs em 10M linhas) vão para um diretório
+    # temporário removido ao final; com --workdir eles são reaproveitados.
+    # Caminho absoluto: o worker faz chdir para o workdir antes de abrir --csv/--output
+    workdir = os.path.abspath(arguments.workdir or tempfile.mkdtemp(prefix='netflix_bench_'))
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        run = benchmark(arguments, workdir)
+    finally:
+        if arguments.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # Acumula as execuções no mesmo arquivo para comparação histórica
+    history = []
+    if os.path.exists(arguments.output):
+        with open(arguments.output, encoding='utf-8') as f:
+            history = json.load(f)
+    history.append(run)
+    with open(arguments.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados gravados em '{arguments.output}'")
+
+if __name__ == "__main__":
+    main()
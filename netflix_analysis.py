@@ -1,24 +1,376 @@
 # ANÁLISE NETFLIX DATASET COM MAPREDUCE - ARQUIVO UNIFICADO
 # Análise completa, criação de série e filme, e visualizações em um só script
 
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  # Backend para não mostrar janelas
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 from collections import Counter, defaultdict
+import argparse
+import heapq
+import importlib
 import re
+import io
+import math
+import os
+import pickle
+import shutil
+import tempfile
+import sys
+import time
+import zlib
+import cProfile
+import contextlib
+import tracemalloc
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
 from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+
+try:
+    import resource
+except ImportError:  # Windows: sem ru_maxrss
+    resource = None
+
+class LazyModule:
+    # Proxy que só importa o módulo no primeiro acesso a um atributo. pandas,
+    # NumPy e matplotlib custam ~1s de importação; comandos que não usam uma
+    # etapa (ex.: a consulta rápida de gêneros não usa gráficos) não pagam por ela
+    
+    def __init__(self, name, setup=None):
+        self._name = name
+        self._setup = setup
+        self._module = None
+    
+    def __getattr__(self, attribute):
+        if self._module is None:
+            if self._setup is not None:
+                self._setup()
+            self._module = importlib.import_module(self._name)
+        value = getattr(self._module, attribute)
+        # Guarda o atributo no proxy: os próximos acessos não passam por __getattr__
+        setattr(self, attribute, value)
+        return value
+
+def _use_agg_backend():
+    import matplotlib
+    matplotlib.use('Agg')  # Backend para não mostrar janelas
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+plt = LazyModule('matplotlib.pyplot', setup=_use_agg_backend)
+asyncio = LazyModule('asyncio')  # só o serviço HTTP usa
+
+# Versão dos resultados produzidos pelos jobs; altere ao mudar qualquer
+# map/reduce para invalidar os caches gravados em disco
+ANALYZER_VERSION = '1.1'
+
+def file_fingerprint(path, full_hash_limit=64 << 20, sample_size=1 << 16, samples=16):
+    # Impressão digital barata do conteúdo: arquivos pequenos são hasheados
+    # por inteiro; nos grandes, tamanho + mtime + amostras espaçadas
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= full_hash_limit:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        else:
+            digest.update(str(os.stat(path).st_mtime_ns).encode())
+            for i in range(samples + 1):
+                f.seek(min(size - sample_size, (size - sample_size) * i // samples))
+                digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+class ResultCache:
+    # Cache em disco (pickle) para resultados e DataFrames, com chave pela
+    # impressão digital do CSV + versão do analisador e despejo LRU por tamanho
+    
+    def __init__(self, cache_dir='.netflix_cache', max_bytes=512 << 20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._fingerprints = {}
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def key(self, csv_file, kind):
+        # A impressão digital é calculada uma vez por versão (mtime/tamanho) do arquivo
+        stat = os.stat(csv_file)
+        version = (os.path.abspath(csv_file), stat.st_mtime_ns, stat.st_size)
+        if version not in self._fingerprints:
+            self._fingerprints[version] = file_fingerprint(csv_file)
+        return f"{kind}-{ANALYZER_VERSION}-{self._fingerprints[version]}"
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+    
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada corrompida ou gravada por outra versão do pandas/numpy
+            # (AttributeError, ModuleNotFoundError, TypeError...): vira cache miss
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+        os.utime(path)  # marca como usado recentemente para o LRU
+        return value
+    
+    def put(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+    
+    def evict(self):
+        # Remove as entradas menos usadas até caber em max_bytes
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+class StageTimer:
+    # Medição de uma execução de etapa; records_out e pairs podem ser
+    # preenchidos dentro do bloco with
+    
+    def __init__(self, profiler, path, records_in):
+        self.profiler = profiler
+        self.path = path
+        self.records_in = records_in
+        self.records_out = None
+        self.pairs = None
+    
+    def __enter__(self):
+        self.profiler._enter(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        self.profiler._exit(self)
+        return False
+
+class _NullStage:
+    # Etapa sem medição: usada quando o profiler está desligado (custo ~zero)
+    
+    records_out = None
+    pairs = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def __setattr__(self, name, value):
+        pass
+
+class StageProfiler:
+    # Instrumentação das etapas do pipeline (map, shuffle, reduce, recomendação,
+    # visualização): tempo de parede, CPU, registros de entrada/saída, pares
+    # intermediários e picos de memória. Etapas com o mesmo caminho (ex.: um
+    # por chunk) são agregadas. Desligado, stage() devolve um no-op
+    
+    _NULL_STAGE = _NullStage()
+    
+    def __init__(self, enabled=True, trace_memory=False, cprofile_path=None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.cprofile_path = cprofile_path if enabled else None
+        self.stages = {}
+        self._open = []
+        self._cprofile = None
+    
+    def stage(self, name, records_in=None):
+        if not self.enabled:
+            return self._NULL_STAGE
+        path = '/'.join([timer.path for timer in self._open[-1:]] + [name])
+        return StageTimer(self, path, records_in)
+    
+    def start(self):
+        # Inicia tracemalloc/cProfile conforme configurado
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+    
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+            self._cprofile = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    
+    def _traced_peak(self):
+        # Pico de alocações Python desde o último reset, propagado às etapas abertas
+        peak = tracemalloc.get_traced_memory()[1]
+        for timer in self._open:
+            timer.memory_peak = max(timer.memory_peak, peak)
+        tracemalloc.reset_peak()
+    
+    def _enter(self, timer):
+        timer.memory_peak = 0
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._traced_peak()
+        self._open.append(timer)
+    
+    def _exit(self, timer):
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._traced_peak()
+        self._open.pop()
+        entry = self.stages.setdefault(timer.path, {
+            'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+            'records_in': None, 'records_out': None, 'pairs': None,
+            'memory_peak_mb': None, 'rss_peak_mb': None,
+        })
+        entry['calls'] += 1
+        entry['wall_seconds'] += timer.wall
+        entry['cpu_seconds'] += timer.cpu
+        for field in ['records_in', 'records_out', 'pairs']:
+            value = getattr(timer, field)
+            if value is not None:
+                entry[field] = (entry[field] or 0) + int(value)
+        if self.trace_memory:
+            entry['memory_peak_mb'] = max(entry['memory_peak_mb'] or 0, timer.memory_peak / 2 ** 20)
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            entry['rss_peak_mb'] = peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+    
+    def to_dict(self):
+        return {path: {key: round(value, 6) if isinstance(value, float) else value
+                       for key, value in entry.items()}
+                for path, entry in self.stages.items()}
+    
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+    
+    def report(self):
+        print("\n⏱️ PERFIL DAS ETAPAS:")
+        for path, entry in self.to_dict().items():
+            details = [f"{label} {entry[field]}" for field, label in
+                       [('records_in', 'entrada'), ('records_out', 'saída'), ('pairs', 'pares')]
+                       if entry[field] is not None]
+            if entry['memory_peak_mb'] is not None:
+                details.append(f"pico {entry['memory_peak_mb']:.1f} MB")
+            print(f"  {path:<40} {entry['wall_seconds']:>8.3f}s  CPU {entry['cpu_seconds']:>8.3f}s  " + "  ".join(details))
+
+# Profiler compartilhado quando nenhum é informado
+NULL_PROFILER = StageProfiler(enabled=False)
 
 class NetflixMapReduce:
     # Implementação de análises usando conceitos MapReduce
     # para o dataset da Netflix
     
-    def __init__(self, csv_file):
-        self.df = pd.read_csv(csv_file)
+    # Jobs executados quando nenhum é escolhido explicitamente
+    DEFAULT_JOBS = ['genres', 'countries', 'ratings', 'years', 'type_analysis']
+    # Jobs opcionais, de alta cardinalidade (muitas chaves distintas)
+    OPTIONAL_JOBS = ['collaborations', 'cast', 'description_tokens']
+    
+    # Termos extraídos das descrições pelo job description_tokens
+    TOKEN_PATTERN = r'\w{3,}'
+    
+    # Linhas mapeadas por lote antes do COMBINE (buffer do mapper, como o io.sort.mb do Hadoop)
+    COMBINE_BATCH = 1000
+    
+    # Linhas agregadas por lote antes de atualizar os sketches (mode='approximate')
+    SKETCH_BATCH = 10000
+    
+    # Colunas lidas por cada job, na ordem do registro de jobs
+    JOB_COLUMNS = {
+        'genres': ['listed_in'],
+        'countries': ['country'],
+        'ratings': ['rating'],
+        'years': ['release_year'],
+        'type_analysis': ['type', 'listed_in', 'country', 'rating', 'release_year'],
+        'collaborations': ['cast', 'director'],
+        'cast': ['cast'],
+        'description_tokens': ['description'],
+    }
+    
+    def __init__(self, csv_file, streaming=False, chunksize=10000, cache=None, job_names=None, profiler=None,
+                 memory_budget=256 << 20):
+        # Aceita o caminho do CSV ou um DataFrame já carregado (ex.: um split)
+        # streaming=True não carrega o arquivo: run_analysis lê chunks sob demanda
+        # cache: ResultCache opcional para o DataFrame e os resultados
+        # job_names: jobs a executar (padrão DEFAULT_JOBS; 'collaborations' é opcional)
+        # profiler: StageProfiler para medir cada etapa map/shuffle/reduce
+        # memory_budget: bytes de pares intermediários em memória no mode='external'
+        self.profiler = profiler or NULL_PROFILER
+        self.memory_budget = memory_budget
+        self.streaming = streaming
+        self.chunksize = chunksize
+        self.cache = cache
+        self.verbose = True
         self.results = {}
         
+        # Registro dos jobs MapReduce: (chave do resultado, map, reduce, colunas, mensagem)
+        self.jobs = [
+            ('genres', self.map_genres, self.reduce_genres, "📊 Analisando gêneros..."),
+            ('countries', self.map_countries, self.reduce_countries, "🌍 Analisando países..."),
+            ('ratings', self.map_ratings, self.reduce_ratings, "⭐ Analisando ratings..."),
+            ('years', self.map_release_years, self.reduce_release_years, "📅 Analisando anos de lançamento..."),
+            ('type_analysis', self.map_type_analysis, self.reduce_type_analysis, "🎭 Analisando por tipo de conteúdo..."),
+            ('collaborations', self.map_collaborations, self.reduce_collaborations,
+             "🤝 Analisando colaborações entre elenco e direção..."),
+            ('cast', self.map_cast, self.reduce_cast, "👥 Analisando elenco..."),
+            ('description_tokens', self.map_description_tokens, self.reduce_description_tokens,
+             "📝 Analisando termos das descrições..."),
+        ]
+        self.job_names = list(job_names or self.DEFAULT_JOBS)
+        self.jobs = [(name, mapper, reducer, self.JOB_COLUMNS[name], message)
+                     for name, mapper, reducer, message in self.jobs if name in self.job_names]
+        
+        # Implementações colunares equivalentes a cada job (mode='vectorized')
+        self.vectorized_jobs = {
+            'genres': self.vectorized_genres,
+            'countries': self.vectorized_countries,
+            'ratings': self.vectorized_ratings,
+            'years': self.vectorized_release_years,
+            'type_analysis': self.vectorized_type_analysis,
+            'collaborations': self.vectorized_collaborations,
+            'cast': self.vectorized_cast,
+            'description_tokens': self.vectorized_description_tokens,
+        }
+        
+        self.snapshot = None
+        self.sketches = None
+        if isinstance(csv_file, pd.DataFrame):
+            self.csv_file = None
+            self.cache = None
+            self.df = csv_file
+        elif os.path.isdir(csv_file):
+            # Snapshot colunar: só as colunas usadas pelos jobs são abertas (memory-map)
+            self.csv_file = None
+            self.snapshot = CatalogSnapshot(csv_file)
+            self.df = None if streaming else self.snapshot.to_frame(self.required_columns())
+        else:
+            self.csv_file = csv_file
+            with self.profiler.stage('load') as stage:
+                self.df = None if streaming else self._load_frame()
+                stage.records_out = None if self.df is None else len(self.df)
+        if self.df is not None:
+            self.row_count = len(self.df)
+        else:
+            # Em streaming sobre snapshot o total de linhas já é conhecido
+            self.row_count = self.snapshot.rows if self.snapshot else 0
+        self.index = None
+        
     def map_genres(self, row):
         # MAP: Extrai gêneros de uma linha
         if pd.isna(row['listed_in']):
@@ -121,89 +473,2103 @@ class NetflixMapReduce:
         
         return dict(type_analysis)
     
-    def run_analysis(self):
+    # ------------------------------------------------------------------
+    # Engine vetorizado: mesmos resultados dos reducers, calculados
+    # sobre colunas inteiras com pandas/NumPy em vez de tuplas por linha
+    # ------------------------------------------------------------------
+    
+    def column(self, name):
+        # Coluna do DataFrame; categóricas (ex.: vindas de um snapshot) são
+        # decodificadas para que contagens sigam a ordem das linhas
+        values = self.df[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        return values
+    
+    def split_multi_values(self, column):
+        # Separa colunas multivaloradas ("A, B, C") em uma linha por valor
+        return self.column(column).dropna().str.split(',').explode().str.strip()
+    
+    def count_values(self, values):
+        # value_counts sem ordenação preserva a ordem da primeira ocorrência,
+        # a mesma ordem de inserção do Counter usado nos reducers
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        counts = values.value_counts(sort=False, dropna=False)
+        return dict(zip(counts.index.tolist(), counts.tolist()))
+    
+    def vectorized_genres(self):
+        return self.count_values(self.split_multi_values('listed_in'))
+    
+    def vectorized_countries(self):
+        return self.count_values(self.split_multi_values('country'))
+    
+    def vectorized_ratings(self):
+        return self.count_values(self.df['rating'].dropna())
+    
+    def vectorized_release_years(self):
+        return self.count_values(self.df['release_year'].dropna().astype(int))
+    
+    def vectorized_type_analysis(self):
+        # Mesmos campos do map_type_analysis, derivados coluna a coluna
+        types = self.column('type')
+        countries = self.column('country').str.split(',').str[0].str.strip().fillna('Unknown')
+        ratings = self.column('rating').fillna('Unknown')
+        years = self.df['release_year'].fillna(0).astype(int)
+        genres = self.split_multi_values('listed_in')
+        
+        type_analysis = {}
+        for content_type, count in self.count_values(types).items():
+            type_analysis[content_type] = {
+                'count': count,
+                'genres': Counter(),
+                'countries': Counter(),
+                'ratings': Counter(),
+                'years': Counter()
+            }
+        
+        grouped = [
+            ('genres', types.loc[genres.index], genres),
+            ('countries', types, countries),
+            ('ratings', types, ratings),
+            ('years', types, years),
+        ]
+        for field, keys, values in grouped:
+            frame = pd.DataFrame({'type': keys.to_numpy(), 'value': values.to_numpy()})
+            sizes = frame.groupby(['type', 'value'], sort=False, dropna=False).size()
+            for (content_type, value), count in zip(sizes.index.tolist(), sizes.tolist()):
+                type_analysis[content_type][field][value] = count
+        
+        return type_analysis
+    
+    def iter_records(self, columns, frame=None):
+        # Gera cada linha (de self.df ou de frame) como dict contendo apenas as
+        # colunas pedidas, sem criar uma Series por linha como o iterrows
+        frame = self.df if frame is None else frame
+        columns = list(dict.fromkeys(columns))
+        for values in zip(*(frame[column] for column in columns)):
+            yield dict(zip(columns, values))
+    
+    def _load_frame(self):
+        # Lê o CSV, reaproveitando o DataFrame do cache quando o arquivo não mudou
+        if self.cache is None:
+            return pd.read_csv(self.csv_file)
+        key = self.cache.key(self.csv_file, 'frame')
+        df = self.cache.get(key)
+        if df is None:
+            df = pd.read_csv(self.csv_file)
+            self.cache.put(key, df)
+        return df
+    
+    def log(self, message):
+        # Mensagens de progresso (silenciadas nas instâncias usadas por chunk/split)
+        if self.verbose:
+            print(message)
+    
+    @classmethod
+    def job_columns(cls, job_names=None):
+        # Colunas lidas pelos jobs (padrão DEFAULT_JOBS), sem instanciar o analisador
+        job_names = job_names or cls.DEFAULT_JOBS
+        return list(dict.fromkeys(column for name, columns in cls.JOB_COLUMNS.items()
+                                  if name in job_names for column in columns))
+    
+    def required_columns(self):
+        # Colunas lidas pelos jobs registrados (projeção usada no streaming)
+        return self.job_columns(self.job_names)
+    
+    def iter_chunks(self, columns=None):
+        # Lê o CSV em blocos de no máximo chunksize linhas, só com as colunas pedidas
+        columns = columns or self.required_columns()
+        if self.snapshot is not None:
+            return self.snapshot.iter_chunks(columns, self.chunksize)
+        return pd.read_csv(self.csv_file, usecols=columns, chunksize=self.chunksize)
+    
+    def load_columns(self, columns):
+        # Carrega apenas algumas colunas (ex.: para a engine de recomendação no modo streaming)
+        if self.df is not None and all(column in self.df for column in columns):
+            return self.df[columns]
+        if self.snapshot is not None:
+            return self.snapshot.to_frame(columns)
+        return pd.read_csv(self.csv_file, usecols=columns)
+    
+    def map_collaborations(self, row):
+        # MAP: pares ator–ator e ator–diretor de um título (nomes em ordem alfabética)
+        cast = [] if pd.isna(row['cast']) else [name.strip() for name in row['cast'].split(',')]
+        directors = [] if pd.isna(row['director']) else [name.strip() for name in row['director'].split(',')]
+        cast = list(dict.fromkeys(cast))
+        pairs = [(a, b) if a < b else (b, a) for i, a in enumerate(cast) for b in cast[i + 1:]]
+        pairs += [(a, d) if a < d else (d, a) for a in cast for d in directors if a != d]
+        return [(pair, 1) for pair in dict.fromkeys(pairs)]
+    
+    def reduce_collaborations(self, mapped_data):
+        # REDUCE: conta quantos títulos cada par dividiu
+        pair_count = Counter()
+        for row_pairs in mapped_data:
+            for pair, count in row_pairs:
+                pair_count[pair] += count
+        return dict(pair_count)
+    
+    def vectorized_collaborations(self):
+        return CollaborationGraph.pair_counts_from_frame(self.df)
+    
+    def map_cast(self, row):
+        # MAP: Extrai membros do elenco de uma linha
+        if pd.isna(row['cast']):
+            return []
+        return [(name.strip(), 1) for name in row['cast'].split(',')]
+    
+    def reduce_cast(self, mapped_data):
+        # REDUCE: Conta títulos por membro do elenco
+        cast_count = Counter()
+        for row_cast in mapped_data:
+            for name, count in row_cast:
+                cast_count[name] += count
+        return dict(cast_count)
+    
+    def vectorized_cast(self):
+        return self.count_values(self.split_multi_values('cast'))
+    
+    def map_description_tokens(self, row):
+        # MAP: Extrai termos (minúsculos) da descrição
+        if pd.isna(row['description']):
+            return []
+        return [(token, 1) for token in re.findall(self.TOKEN_PATTERN, row['description'].lower())]
+    
+    def reduce_description_tokens(self, mapped_data):
+        # REDUCE: Conta ocorrências de cada termo
+        token_count = Counter()
+        for row_tokens in mapped_data:
+            for token, count in row_tokens:
+                token_count[token] += count
+        return dict(token_count)
+    
+    def vectorized_description_tokens(self):
+        tokens = self.column('description').dropna().str.lower().str.findall(self.TOKEN_PATTERN)
+        return self.count_values(tokens.explode().dropna())
+    
+    def run_analysis(self, mode='classic', workers=None, build_index=False):
         # Executa todas as análises MapReduce
-        print("🎬 Iniciando análise MapReduce do dataset Netflix...")
+        # mode='classic': uma passada pelo dataset para cada job
+        # mode='fused': uma única passada alimentando todos os mappers
+        # mode='vectorized': contagens sobre colunas inteiras (pandas/NumPy)
+        # mode='parallel': splits do CSV processados em vários processos
+        # mode='external': shuffle com runs ordenados em disco (ExternalSortShuffle),
+        # para jobs cujos pares intermediários não cabem em memory_budget
+        # mode='approximate': sketches de memória fixa (SketchAggregates) no MAP;
+        # com workers, splits do CSV em processos e sketches mesclados
+        # Com streaming=True, o modo escolhido é aplicado a cada chunk do CSV
+        # build_index=True também monta o CatalogIndex para consultas ad-hoc
+        self.log("🎬 Iniciando análise MapReduce do dataset Netflix...")
         
-        # Análise de gêneros
-        print("📊 Analisando gêneros...")
-        mapped_genres = [self.map_genres(row) for _, row in self.df.iterrows()]
-        self.results['genres'] = self.reduce_genres(mapped_genres)
+        cache_kind = 'results-' + '+'.join(self.job_names)
+        # Resultados aproximados não entram no cache (seriam servidos a modos exatos)
+        use_cache = self.cache and self.csv_file and mode != 'approximate'
+        cache_key = self.cache.key(self.csv_file, cache_kind) if use_cache else None
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            self.results.update(cached['results'])
+            self.row_count = cached['rows']
+            self.log("♻️ Resultados carregados do cache (CSV inalterado)")
+        else:
+            if mode == 'parallel':
+                if self.csv_file is None:
+                    raise ValueError("O modo 'parallel' precisa do caminho do arquivo CSV")
+                executor = LocalMapReduceExecutor(self.csv_file, workers=workers, job_names=self.job_names,
+                                                  profiler=self.profiler)
+                executor.verbose = self.verbose
+                self.results.update(executor.run())
+                self.row_count = executor.rows
+            elif mode == 'approximate':
+                self.sketches = self._run_approximate(workers)
+                self.results.update(self.sketches.results())
+                self.row_count = self.sketches.rows
+            elif self.streaming and mode == 'external':
+                # Uma única passada pelos chunks alimenta o mesmo shuffle externo
+                self.row_count = 0
+                self.results.update(self._run_external(self._streamed_records()))
+            elif self.streaming:
+                self._run_streaming(mode)
+            else:
+                self.results.update(self.compute(mode))
+            
+            if cache_key:
+                self.cache.put(cache_key, {'results': self.results, 'rows': self.row_count})
+            self.log("✅ Análise MapReduce concluída!")
         
-        # Análise de países
-        print("🌍 Analisando países...")
-        mapped_countries = [self.map_countries(row) for _, row in self.df.iterrows()]
-        self.results['countries'] = self.reduce_countries(mapped_countries)
+        if build_index:
+            self.log("🗂️ Construindo índices invertidos...")
+            self.index = CatalogIndex(self.catalog())
+        return self.results
+    
+    def combine(self, records, jobs=None):
+        # COMBINE: os registros são mapeados em lotes de COMBINE_BATCH linhas e
+        # cada lote é reduzido localmente pelo próprio reduce_* do job (que faz o
+        # papel de combiner); o parcial do lote é somado ao parcial do mapper.
+        # Nenhuma lista do dataset inteiro é mantida: a memória intermediária é
+        # proporcional às chaves distintas, mais um lote.
+        # Os tempos de MAP e de REDUCE (combiner + soma no parcial) de todos os
+        # lotes são agregados nas subetapas map e reduce da etapa aberta.
+        # Retorna os parciais por job e o total de pares emitidos pelos mappers
+        jobs = jobs or self.jobs
+        partials = {name: {} for name, _, _, _, _ in jobs}
+        pairs = 0
+        records = iter(records)
+        while True:
+            block = list(islice(records, self.COMBINE_BATCH))
+            if not block:
+                break
+            for name, mapper, reducer, _, _ in jobs:
+                with self.profiler.stage('map', records_in=len(block)) as stage:
+                    mapped = [mapper(row) for row in block]
+                    stage.pairs = block_pairs = sum(len(row_pairs) for row_pairs in mapped)
+                pairs += block_pairs
+                with self.profiler.stage('reduce', records_in=block_pairs) as stage:
+                    reduced = reducer(mapped)
+                    merge_results(partials[name], reduced)
+                    stage.records_out = len(reduced)
+        return partials, pairs
+    
+    def catalog(self):
+        # CompactCatalog do dataset (direto do snapshot quando disponível)
+        if self.snapshot is not None:
+            return self.snapshot.catalog()
+        columns = CompactCatalog.TEXT_COLUMNS + CompactCatalog.CATEGORICAL_COLUMNS + ['release_year', 'duration']
+        return CompactCatalog.from_frame(self.load_columns(columns))
+    
+    def compute(self, mode):
+        # Calcula os resultados de todos os jobs sobre self.df
+        results = {}
+        rows = len(self.df)
+        if mode == 'classic':
+            for job in self.jobs:
+                name, message = job[0], job[4]
+                self.log(message)
+                with self.profiler.stage(f'{name}/combine', records_in=rows) as stage:
+                    partials, stage.pairs = self.combine((row for _, row in self.df.iterrows()), [job])
+                    results[name] = partials[name]
+                    stage.records_out = len(results[name])
+        elif mode == 'fused':
+            self._run_fused(results)
+        elif mode == 'external':
+            results.update(self._run_external(self.iter_records(self.required_columns())))
+        elif mode == 'vectorized':
+            for name, _, _, _, message in self.jobs:
+                self.log(message)
+                with self.profiler.stage(f'{name}/vectorized', records_in=rows) as stage:
+                    results[name] = self.vectorized_jobs[name]()
+                    stage.records_out = len(results[name])
+        else:
+            raise ValueError(f"Modo de execução desconhecido: {mode}")
+        return results
+    
+    def _run_fused(self, results):
+        # MAP fundido: cada linha é lida uma única vez e entregue a todos os
+        # mappers; o COMBINE por lote já entrega os totais de cada job
+        self.log("⚡ Executando MAP fundido (passada única)...")
+        with self.profiler.stage('fused/combine', records_in=len(self.df)) as stage:
+            partials, stage.pairs = self.combine(self.iter_records(self.required_columns()))
+            stage.records_out = sum(len(partial) for partial in partials.values())
+        for name, _, _, _, message in self.jobs:
+            self.log(message)
+            results[name] = partials[name]
+    
+    def _streamed_records(self):
+        # Registros de todos os chunks, em ordem, contando as linhas lidas
+        columns = self.required_columns()
+        for chunk in self.iter_chunks(columns):
+            self.row_count += len(chunk)
+            yield from self.iter_records(columns, chunk)
+    
+    def _run_external(self, records):
+        # MAP com shuffle externo: os pares de cada job vão para um
+        # ExternalSortShuffle (o orçamento de memória é dividido entre os jobs);
+        # o que não cabe é despejado em runs ordenados e intercalado no REDUCE
+        budget = self.memory_budget // max(len(self.jobs), 1)
+        self.log(f"💾 Executando MAP com shuffle externo (orçamento de {self.memory_budget / 2**20:.0f} MB)...")
+        shuffles = {name: ExternalSortShuffle(budget) for name, _, _, _, _ in self.jobs}
+        results = {}
+        try:
+            with self.profiler.stage('external/map') as stage:
+                rows = 0
+                for row in records:
+                    rows += 1
+                    for name, mapper, _, _, _ in self.jobs:
+                        shuffles[name].add(mapper(row))
+                stage.records_in = rows
+                stage.records_out = stage.pairs = sum(shuffle.sequence for shuffle in shuffles.values())
+            
+            for name, _, reducer, _, message in self.jobs:
+                self.log(message)
+                shuffle = shuffles[name]
+                runs = len(shuffle.runs)
+                with self.profiler.stage(f'{name}/reduce', records_in=shuffle.sequence) as stage:
+                    results[name] = shuffle.reduce(reducer)
+                    stage.records_out = len(results[name])
+                if runs:
+                    self.log(f"   💾 {runs} runs ordenados em disco intercalados no reduce")
+        finally:
+            for shuffle in shuffles.values():
+                shuffle.close()
+        return results
+    
+    def sketch(self, frames, sketches=None):
+        # MAP aproximado: cada lote de SKETCH_BATCH linhas é contado pelos jobs
+        # vetorizados e só as contagens do lote atualizam os sketches, de uma
+        # vez; a memória fica limitada ao lote e não ao catálogo
+        sketches = sketches or SketchAggregates()
+        for frame in frames:
+            for start in range(0, len(frame), self.SKETCH_BATCH):
+                batch_analyzer = NetflixMapReduce(frame.iloc[start:start + self.SKETCH_BATCH], job_names=self.job_names)
+                batch_analyzer.verbose = False
+                for name, partial in batch_analyzer.compute('vectorized').items():
+                    if name == 'type_analysis':
+                        for content_type, data in partial.items():
+                            sketches.add_type(content_type, data)
+                    else:
+                        sketches.add_counts(name, partial)
+            if 'duration' in frame and 'type' in frame:
+                sketches.add_durations(frame)
+            sketches.rows += len(frame)
+        return sketches
+    
+    def _run_approximate(self, workers=None):
+        self.log("📐 Executando MAP aproximado (sketches de memória fixa)...")
+        columns = list(dict.fromkeys(self.required_columns() + ['type', 'duration']))
+        with self.profiler.stage('approximate/map') as stage:
+            if workers and workers > 1 and self.csv_file is not None:
+                # Um SketchAggregates por split, mesclados na ordem dos splits
+                header, splits = find_csv_splits(self.csv_file, workers)
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(_run_sketch_task, self.csv_file, header, start, end, self.job_names)
+                               for start, end in splits]
+                    sketches = SketchAggregates()
+                    for future in futures:
+                        sketches.merge(future.result())
+            elif self.df is None:
+                sketches = self.sketch(self.iter_chunks(columns))
+            else:
+                frame = self.df if all(column in self.df for column in columns) else self.load_columns(columns)
+                sketches = self.sketch([frame])
+            stage.records_in = sketches.rows
+        return sketches
+    
+    def _run_streaming(self, mode):
+        # Ingestão em chunks: cada bloco é mapeado e reduzido localmente e o
+        # resultado parcial é somado ao total; o pico de memória depende do
+        # chunksize e não do tamanho do arquivo
+        self.log(f"🌊 Processando em streaming (chunks de {self.chunksize} linhas)...")
+        self.results = {}
+        self.row_count = 0
+        chunks = iter(self.iter_chunks())
+        while True:
+            with self.profiler.stage('streaming/read') as stage:
+                chunk = next(chunks, None)
+                stage.records_out = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            chunk_analyzer = NetflixMapReduce(chunk, job_names=self.job_names, profiler=self.profiler)
+            chunk_analyzer.verbose = False
+            partial = chunk_analyzer.compute(mode)
+            with self.profiler.stage('streaming/merge') as stage:
+                merge_results(self.results, partial)
+            self.row_count += len(chunk)
+
+def merge_results(target, partial, sign=1):
+    # Soma resultados parciais (contagens e Counters aninhados) em target.
+    # Chaves novas entram no fim, preservando a ordem de primeira ocorrência.
+    # Com sign=-1 a contribuição é removida: contagens zeradas saem do
+    # resultado, assim como entradas de type_analysis cujo 'count' zerou
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            child = target.setdefault(key, type(value)())
+            merge_results(child, value, sign)
+            if 'count' in value and 'count' not in child:
+                del target[key]
+        else:
+            target[key] = target.get(key, 0) + sign * value
+            if target[key] == 0:
+                del target[key]
+    return target
+
+def estimate_size(value):
+    # Tamanho aproximado em memória de uma chave/valor emitido pelo map
+    # (contêineres somados recursivamente), usado no orçamento do shuffle externo
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    return size
+
+# Ordem dos pares no shuffle externo: (chave, sequência)
+_shuffle_order = itemgetter(0, 1)
+
+class ExternalSortShuffle:
+    # Shuffle out-of-core de um job: os pares (chave, valor) emitidos pelo map
+    # ficam em um buffer; quando o tamanho estimado passa de memory_budget, o
+    # buffer é ordenado por chave e gravado em disco como um run. No reduce os
+    # runs são intercalados (k-way merge com heapq) e entregues em ordem de
+    # chave ao reduce_* do job, com só um bloco de cada run em memória. Com mais
+    # de MERGE_FAN_IN runs, grupos de runs são antes intercalados em runs maiores
+    # (merge em várias passadas), o que limita os arquivos abertos ao mesmo
+    # tempo. Cada par carrega seu número de sequência, o que mantém no resultado
+    # a ordem de primeira ocorrência das chaves. As chaves de um job precisam
+    # ser comparáveis
+    
+    BLOCK = 4096  # pares por bloco gravado/lido de cada run
+    PAIR_OVERHEAD = 100  # tupla (chave, sequência, valor) + posição na lista
+    MERGE_FAN_IN = 64  # runs abertos ao mesmo tempo em cada passada do merge
+    
+    def __init__(self, memory_budget=256 << 20, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.sequence = 0
+        self.runs = []
+        self._run_id = 0
+        self._temporary_dir = None
+    
+    def add(self, pairs):
+        for key, value in pairs:
+            self.buffer.append((key, self.sequence, value))
+            self.sequence += 1
+            self.buffer_bytes += estimate_size(key) + estimate_size(value) + self.PAIR_OVERHEAD
+        if self.buffer_bytes > self.memory_budget:
+            self._spill()
+    
+    def _spill(self):
+        self.buffer.sort(key=_shuffle_order)
+        self.runs.append(self._write_run(self.buffer))
+        self.buffer = []
+        self.buffer_bytes = 0
+    
+    def _write_run(self, pairs):
+        # Grava pares já ordenados em blocos de BLOCK e devolve o caminho do run
+        if self.spill_dir is None:
+            self.spill_dir = self._temporary_dir = tempfile.mkdtemp(prefix='netflix_shuffle_')
+        self._run_id += 1
+        path = os.path.join(self.spill_dir, f'run_{id(self)}_{self._run_id}.pkl')
+        pairs = iter(pairs)
+        with open(path, 'wb') as f:
+            while True:
+                block = list(islice(pairs, self.BLOCK))
+                if not block:
+                    break
+                pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+    
+    def _merge_passes(self):
+        # Intercala grupos de até MERGE_FAN_IN runs em runs maiores até que todos
+        # (mais o buffer) caibam em uma única passada final
+        while len(self.runs) >= self.MERGE_FAN_IN:
+            merged = []
+            for start in range(0, len(self.runs), self.MERGE_FAN_IN):
+                group = self.runs[start:start + self.MERGE_FAN_IN]
+                if len(group) == 1:
+                    merged.extend(group)
+                    continue
+                merged.append(self._write_run(
+                    heapq.merge(*(self._read_run(path) for path in group), key=_shuffle_order)))
+                for path in group:
+                    os.remove(path)
+            self.runs = merged
+    
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    block = pickle.load(f)
+                except EOFError:
+                    return
+                yield from block
+    
+    def reduce(self, reducer):
+        # Aplica reducer (um reduce_* que aceita qualquer iterável de listas de
+        # pares) ao fluxo intercalado e devolve o resultado na ordem de primeira ocorrência
+        try:
+            if not self.runs:
+                # Tudo coube no orçamento: o buffer já está na ordem de emissão
+                return reducer(((key, value),) for key, _, value in self.buffer)
+            
+            self.buffer.sort(key=_shuffle_order)
+            self._merge_passes()
+            streams = [self._read_run(path) for path in self.runs] + [iter(self.buffer)]
+            first_seen = {}
+            
+            def merged():
+                for key, sequence, value in heapq.merge(*streams, key=_shuffle_order):
+                    if key not in first_seen:
+                        first_seen[key] = sequence
+                    yield ((key, value),)
+            
+            reduced = reducer(merged())
+            return {key: reduced[key] for key in sorted(first_seen, key=first_seen.get)}
+        finally:
+            self.close()
+    
+    def close(self):
+        # Remove os runs gravados e libera o buffer
+        for path in self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        if self._temporary_dir is not None:
+            shutil.rmtree(self._temporary_dir, ignore_errors=True)
+            self.spill_dir = self._temporary_dir = None
+        self.runs = []
+        self.buffer = []
+        self.buffer_bytes = 0
+
+def stable_hashes(keys):
+    # Hashes uint64 de várias chaves de uma vez, iguais em todos os processos
+    # (hash() de str muda por processo); em chaves tupla (ex.: pares do
+    # collaborations) os hashes de cada posição são combinados
+    if keys and isinstance(keys[0], tuple):
+        hashed = np.zeros(len(keys), dtype=np.uint64)
+        for values in zip(*keys):
+            hashed = (hashed * np.uint64(0x9E3779B97F4A7C15)) ^ stable_hashes(values)
+        return hashed
+    return pd.util.hash_array(np.array(keys, dtype=object))
+
+def bit_lengths(values):
+    # int.bit_length de um array uint64; frexp só é exato abaixo de 2^53,
+    # então as metades de 32 bits são medidas separadamente
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+class CountMinSketch:
+    # Frequência aproximada por chave em uma matriz depth × width fixa. A
+    # estimativa nunca subestima e, com probabilidade 1 - e^-depth, excede a
+    # real em no máximo (e / width) · N. Atualizações chegam em lotes de
+    # hashes (stable_hashes) e são aplicadas com NumPy
+    
+    def __init__(self, width=16384, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+    
+    def _columns(self, hashed):
+        # Hashing duplo: coluna da linha i = (h1 + i·h2) mod width (depth × n)
+        h1, h2 = hashed & np.uint64(0xFFFFFFFF), (hashed >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * h2) % np.uint64(self.width)).astype(np.intp)
+    
+    def _estimates(self, columns):
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+    
+    def add_many(self, hashed, counts):
+        # Soma counts às chaves (distintas) dos hashes e devolve as novas
+        # estimativas: a de antes do lote mais a contagem, sem somar as
+        # colisões entre chaves do próprio lote
+        columns = self._columns(hashed)
+        estimates = self._estimates(columns) + counts
+        for row, row_columns in zip(self.table, columns):
+            np.add.at(row, row_columns, counts)
+        self.total += int(counts.sum())
+        return estimates
+    
+    def estimate(self, key):
+        return int(self._estimates(self._columns(stable_hashes([key])))[0])
+    
+    def error_bound(self):
+        # Erro aditivo máximo (com confiança confidence())
+        return math.e / self.width * self.total
+    
+    def confidence(self):
+        return 1 - math.exp(-self.depth)
+    
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches com dimensões diferentes não podem ser mesclados")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+class SpaceSaving:
+    # Top-k aproximado (Metwally et al.) com no máximo `capacity` contadores:
+    # uma chave nova ocupa o lugar da menos frequente e herda sua contagem como
+    # erro. Para cada chave monitorada, count - error ≤ real ≤ count; chaves
+    # não monitoradas têm real ≤ min_count(). Com capacity ≥ chaves distintas
+    # o resultado é exato.
+    # add() aceita a estimativa de um Count-Min (limite superior da contagem
+    # real): chaves cuja estimativa não supera a menor monitorada não entram,
+    # o que evita que caudas longas (ex.: elenco) fiquem trocando de lugar
+    
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._floor = None
+    
+    def add(self, key, count=1, estimate=None):
+        counts = self.counts
+        if key in counts:
+            if counts[key] == self._floor:
+                self._floor = None
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            self._floor = None
+        else:
+            floor = self.min_count()
+            if estimate is not None and estimate <= floor:
+                return
+            upper = floor + count if estimate is None else min(floor + count, estimate)
+            victim = min(counts, key=counts.get)
+            del counts[victim], self.errors[victim]
+            counts[key] = upper
+            self.errors[key] = upper - count
+            self._floor = None
+    
+    def add_many(self, keys, counts, estimates):
+        # Lote de chaves distintas com contagens e estimativas Count-Min. Se
+        # tudo cabe, as chaves entram na ordem do lote (primeira ocorrência);
+        # senão a ordem de chegada é livre: as monitoradas somam primeiro e
+        # as novas entram por estimativa decrescente até a primeira que add()
+        # recusaria, já que o piso só cresce
+        if len(self.counts) + len(keys) <= self.capacity:
+            order = np.arange(len(keys))
+        else:
+            monitored = np.fromiter((key in self.counts for key in keys), dtype=bool, count=len(keys))
+            candidates = np.flatnonzero(~monitored)
+            order = np.concatenate([np.flatnonzero(monitored),
+                                    candidates[np.argsort(-estimates[candidates], kind='stable')]])
+        counts, estimates = counts.tolist(), estimates.tolist()
+        for index in order.tolist():
+            key = keys[index]
+            if key not in self.counts and estimates[index] <= self.min_count():
+                break
+            self.add(key, counts[index], estimates[index])
+    
+    def min_count(self):
+        # Limite superior da contagem de qualquer chave fora do sketch
+        if len(self.counts) < self.capacity:
+            return 0
+        if self._floor is None:
+            self._floor = min(self.counts.values())
+        return self._floor
+    
+    def merge(self, other):
+        # Mescla de Agarwal et al.: chave ausente de um lado conta o min_count
+        # daquele lado (como contagem e como erro); mantém os capacity maiores
+        own_floor, other_floor = self.min_count(), other.min_count()
+        counts, errors = {}, {}
+        for key in list(self.counts) + [key for key in other.counts if key not in self.counts]:
+            counts[key] = self.counts.get(key, own_floor) + other.counts.get(key, other_floor)
+            errors[key] = self.errors.get(key, own_floor) + other.errors.get(key, other_floor)
+        kept = set(sorted(counts, key=counts.get, reverse=True)[:self.capacity])
+        self.counts = {key: count for key, count in counts.items() if key in kept}
+        self.errors = {key: errors[key] for key in self.counts}
+        self._floor = None
+        return self
+    
+    def top(self, k=None):
+        # [(chave, contagem, erro máximo)] em ordem decrescente de contagem
+        ranked = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+class HyperLogLog:
+    # Contagem aproximada de valores distintos em 2^precision registradores de
+    # um byte; erro padrão relativo de 1.04 / sqrt(2^precision) (1,6% com 12)
+    
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+    
+    def add_many(self, hashed):
+        # Registrador = bits altos do hash; posto = posição do primeiro 1 no resto
+        bits = 64 - self.precision
+        index = (hashed >> np.uint64(bits)).astype(np.intp)
+        rest = hashed & np.uint64((1 << bits) - 1)
+        np.maximum.at(self.registers, index, (bits - bit_lengths(rest) + 1).astype(np.uint8))
+    
+    def count(self):
+        m = len(self.registers)
+        registers = self.registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # correção para poucos valores (linear counting)
+        return int(round(estimate))
+    
+    def standard_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+    
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLogs com precisões diferentes não podem ser mesclados")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+class QuantileSketch:
+    # Quantis com erro relativo ≤ relative_accuracy (no estilo DDSketch): cada
+    # valor positivo cai no bucket ceil(log_gamma(v)), gamma = (1 + a) / (1 - a).
+    # O número de buckets depende só da faixa de valores, não da quantidade,
+    # e mesclar é somar as contagens dos buckets
+    
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.zeros = 0
+        self.count = 0
+    
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        self.buckets.update(dict(zip(indexes.tolist(), counts.tolist())))
+    
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+    
+    def merge(self, other):
+        if self.relative_accuracy != other.relative_accuracy:
+            raise ValueError("Sketches de quantis com precisões diferentes não podem ser mesclados")
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+class SketchAggregates:
+    # Agregados aproximados mantidos na fase MAP (mode='approximate'): para
+    # cada job de contagem, SpaceSaving (top-k), Count-Min (frequência de uma
+    # chave) e HyperLogLog (valores distintos); para type_analysis, contagem
+    # exata por tipo e SpaceSaving por campo; durações em QuantileSketch por
+    # tipo. A memória é fixa em relação ao tamanho do catálogo e sketches de
+    # chunks/splits diferentes se mesclam com merge()
+    
+    TYPE_FIELDS = ['genres', 'countries', 'ratings', 'years']
+    
+    def __init__(self, capacity=256, width=16384, depth=4, precision=12, relative_accuracy=0.01):
+        self.options = {'capacity': capacity, 'width': width, 'depth': depth, 'precision': precision,
+                        'relative_accuracy': relative_accuracy}
+        self.rows = 0
+        self.jobs = {}
+        self.types = {}
+        self.durations = {}
+    
+    def _job(self, name):
+        if name not in self.jobs:
+            self.jobs[name] = (SpaceSaving(self.options['capacity']),
+                               CountMinSketch(self.options['width'], self.options['depth']),
+                               HyperLogLog(self.options['precision']))
+        return self.jobs[name]
+    
+    def _type(self, content_type):
+        if content_type not in self.types:
+            self.types[content_type] = {'count': 0, **{field: SpaceSaving(self.options['capacity'])
+                                                       for field in self.TYPE_FIELDS}}
+        return self.types[content_type]
+    
+    def _duration(self, content_type, unit):
+        key = (content_type, unit)
+        if key not in self.durations:
+            self.durations[key] = QuantileSketch(self.options['relative_accuracy'])
+        return self.durations[key]
+    
+    def add_counts(self, job, counts):
+        # Contagens de um lote ({chave: contagem}, na ordem de primeira
+        # ocorrência): um hash por chave distinta e Count-Min/HyperLogLog
+        # atualizados de uma vez; o SpaceSaving filtra pelas novas estimativas
+        if not counts:
+            return
+        top, frequency, distinct = self._job(job)
+        keys = list(counts)
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(keys))
+        hashed = stable_hashes(keys)
+        distinct.add_many(hashed)
+        top.add_many(keys, values, frequency.add_many(hashed, values))
+    
+    def add_type(self, content_type, data):
+        # Parcial do type_analysis de um lote para um tipo
+        sketches = self._type(content_type)
+        sketches['count'] += data['count']
+        for field in self.TYPE_FIELDS:
+            for key, count in data[field].items():
+                sketches[field].add(key, count)
+    
+    def add_durations(self, frame):
+        # Durações de um bloco (minutos dos filmes, temporadas das séries), vetorizado
+        minutes, seasons = parse_durations(frame['duration'])
+        types = frame['type']
+        for unit, values in [('minutes', minutes), ('seasons', seasons)]:
+            values = values.astype('float64')
+            for content_type in types.dropna().unique():
+                selected = values[(types == content_type).to_numpy()].dropna()
+                if len(selected):
+                    self._duration(content_type, unit).add_many(selected.to_numpy())
+    
+    def merge(self, other):
+        self.rows += other.rows
+        for name, sketches in other.jobs.items():
+            for own, theirs in zip(self._job(name), sketches):
+                own.merge(theirs)
+        for content_type, sketches in other.types.items():
+            own = self._type(content_type)
+            own['count'] += sketches['count']
+            for field in self.TYPE_FIELDS:
+                own[field].merge(sketches[field])
+        for (content_type, unit), sketch in other.durations.items():
+            self._duration(content_type, unit).merge(sketch)
+        return self
+    
+    def results(self):
+        # Resultados no formato do run_analysis, com as contagens aproximadas
+        results = {name: dict(top.counts) for name, (top, _, _) in self.jobs.items()}
+        if self.types:
+            results['type_analysis'] = {
+                content_type: {'count': sketches['count'],
+                               **{field: Counter(sketches[field].counts) for field in self.TYPE_FIELDS}}
+                for content_type, sketches in self.types.items()}
+        return results
+    
+    def frequency(self, job, key):
+        # (estimativa Count-Min, erro aditivo máximo) de uma chave qualquer
+        _, frequency, _ = self.jobs[job]
+        return frequency.estimate(key), frequency.error_bound()
+    
+    def distinct(self, job):
+        # (valores distintos estimados, erro padrão relativo)
+        _, _, distinct = self.jobs[job]
+        return distinct.count(), distinct.standard_error()
+    
+    def report(self, k=5):
+        print("\n📐 AGREGADOS APROXIMADOS (sketches):")
+        for name, (top, frequency, distinct) in self.jobs.items():
+            print(f"\n{name}: ~{distinct.count()} valores distintos (±{distinct.standard_error():.1%}), "
+                  f"Count-Min ±{frequency.error_bound():.1f} com {frequency.confidence():.0%} de confiança")
+            for i, (key, count, error) in enumerate(top.top(k), 1):
+                print(f"  {i}. {key}: {count} títulos (erro ≤ {error})")
+        if self.durations:
+            print(f"\n⏱️ Durações (quantis com erro relativo ≤ {self.options['relative_accuracy']:.0%}):")
+            for (content_type, unit), sketch in self.durations.items():
+                label = 'min' if unit == 'minutes' else 'temporadas'
+                print(f"  {content_type}: p50 ≈ {sketch.quantile(0.5):.1f} {label}, "
+                      f"p90 ≈ {sketch.quantile(0.9):.1f} {label} ({sketch.count} títulos)")
+
+class IncrementalAnalysisState:
+    # Estado incremental e persistente da análise: guarda, por show_id, os
+    # campos que os jobs leem e os agregados resultantes. Um CSV delta é
+    # incorporado removendo a contribuição antiga dos títulos alterados ou
+    # removidos e somando a nova, sem reprocessar o restante do catálogo
+    
+    FORMAT_VERSION = 1
+    
+    def __init__(self, columns):
+        self.columns = columns
+        self.titles = {}
+        self.results = {}
+        # Resumo de cada delta no stdout (desligado para bibliotecas e serviços)
+        self.verbose = True
+    
+    @classmethod
+    def build(cls, csv_file, mode='vectorized', chunksize=10000):
+        # Constrói o estado inicial lendo o catálogo completo em chunks
+        state = cls(NetflixMapReduce.job_columns())
+        for chunk in pd.read_csv(csv_file, usecols=['show_id'] + state.columns, chunksize=chunksize):
+            state._fold_rows(state._rows(chunk), mode, sign=1)
+        return state
+    
+    def _rows(self, frame):
+        # show_id -> tupla dos campos; NaN vira None para que linhas iguais comparem iguais
+        frame = frame.astype(object).where(frame.notna(), None)
+        return dict(zip(frame['show_id'], zip(*(frame[column] for column in self.columns))))
+    
+    def _fold_rows(self, rows, mode, sign):
+        # Soma (sign=1) ou remove (sign=-1) a contribuição de um lote de títulos
+        if not rows:
+            return
+        if sign > 0:
+            self.titles.update(rows)
+        else:
+            for show_id in rows:
+                del self.titles[show_id]
+        frame = pd.DataFrame(list(rows.values()), columns=self.columns)
+        analyzer = NetflixMapReduce(frame)
+        analyzer.verbose = False
+        merge_results(self.results, analyzer.compute(mode), sign)
+    
+    def apply_delta(self, delta, removed_ids=(), mode='vectorized'):
+        # Incorpora um delta (caminho de CSV ou DataFrame com títulos novos ou
+        # alterados) e remove os show_ids em removed_ids. O custo é proporcional
+        # ao tamanho do delta
+        if not isinstance(delta, pd.DataFrame):
+            delta = pd.read_csv(delta, usecols=['show_id'] + self.columns)
+        incoming = self._rows(delta)
         
-        # Análise de ratings
-        print("⭐ Analisando ratings...")
-        mapped_ratings = [self.map_ratings(row) for _, row in self.df.iterrows()]
-        self.results['ratings'] = self.reduce_ratings(mapped_ratings)
+        stale = {}
+        added = {}
+        for show_id, row in incoming.items():
+            previous = self.titles.get(show_id)
+            if previous == row:
+                continue
+            if previous is not None:
+                stale[show_id] = previous
+            added[show_id] = row
+        for show_id in removed_ids:
+            if show_id in self.titles and show_id not in stale:
+                stale[show_id] = self.titles[show_id]
         
-        # Análise de anos
-        print("📅 Analisando anos de lançamento...")
-        mapped_years = [self.map_release_years(row) for _, row in self.df.iterrows()]
-        self.results['years'] = self.reduce_release_years(mapped_years)
+        self._fold_rows(stale, mode, sign=-1)
+        self._fold_rows(added, mode, sign=1)
         
-        # Análise por tipo
-        print("🎭 Analisando por tipo de conteúdo...")
-        mapped_types = [self.map_type_analysis(row) for _, row in self.df.iterrows()]
-        self.results['type_analysis'] = self.reduce_type_analysis(mapped_types)
+        summary = {
+            'added': sum(1 for show_id in added if show_id not in stale),
+            'changed': sum(1 for show_id in added if show_id in stale),
+            'removed': sum(1 for show_id in stale if show_id not in added),
+        }
+        if self.verbose:
+            print(f"🔁 Delta aplicado: {summary['added']} novos, {summary['changed']} alterados, "
+                  f"{summary['removed']} removidos")
+        return summary
+    
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump({'version': self.FORMAT_VERSION, 'columns': self.columns,
+                         'titles': self.titles, 'results': self.results}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f"Versão de estado incompatível em {path}")
+        state = cls(payload['columns'])
+        state.titles = payload['titles']
+        state.results = payload['results']
+        return state
+
+def parse_durations(durations):
+    # Separa a coluna duration ("90 min" / "2 Seasons") em minutos e temporadas,
+    # uma única vez e de forma vetorizada
+    minutes = durations.str.extract(r'^(\d+) min', expand=False)
+    seasons = durations.str.extract(r'^(\d+) Season', expand=False)
+    return minutes.astype('Int16'), seasons.astype('Int16')
+
+def parse_date_added(dates):
+    # Converte date_added ("September 25, 2021", às vezes com espaços à
+    # esquerda) em datetime64 de forma vetorizada; valores ausentes viram NaT
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        dates = dates.astype(object)
+    return pd.to_datetime(dates.str.strip(), format='%B %d, %Y', errors='coerce')
+
+class MultiValuedColumn:
+    # Coluna multivalorada ("A, B, C") em formato CSR: os valores da linha i
+    # são codes[offsets[i]:offsets[i + 1]], com codes indexando vocab.
+    # O vocabulário segue a ordem de primeira ocorrência no dataset
+    
+    def __init__(self, offsets, codes, vocab):
+        self.offsets = offsets
+        self.codes = codes
+        self.vocab = vocab
+        self.lookup = {value: code for code, value in enumerate(vocab)}
+    
+    @classmethod
+    def from_series(cls, series):
+        parts = series.str.split(',')
+        lengths = parts.str.len().fillna(0).to_numpy(dtype=np.int64)
+        offsets = np.zeros(len(series) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = parts.explode().dropna().str.strip()
+        codes, vocab = pd.factorize(values)
+        return cls(offsets, codes.astype(np.int32), list(vocab))
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def row_codes(self, row):
+        return self.codes[self.offsets[row]:self.offsets[row + 1]]
+    
+    def row_values(self, row):
+        return [self.vocab[code] for code in self.row_codes(row)]
+    
+    def row_ids(self):
+        # Linha de origem de cada posição de codes
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.offsets))
+    
+    def counts(self):
+        # Contagem por valor (equivale ao reduce_genres/reduce_countries)
+        totals = np.bincount(self.codes, minlength=len(self.vocab))
+        return dict(zip(self.vocab, totals.tolist()))
+    
+    def nbytes(self):
+        return self.offsets.nbytes + self.codes.nbytes
+
+class CompactCatalog:
+    # Representação compacta e tipada do catálogo: colunas de baixa
+    # cardinalidade como categóricas, gêneros/países como CSR de inteiros e
+    # duration já separada em minutos/temporadas numéricos
+    
+    CATEGORICAL_COLUMNS = ['type', 'rating', 'country', 'listed_in']
+    TEXT_COLUMNS = ['show_id', 'title']
+    
+    def __init__(self, frame, genres, countries):
+        self.frame = frame
+        self.genres = genres
+        self.countries = countries
+    
+    @classmethod
+    def from_frame(cls, df, text_columns=None):
+        # text_columns: colunas de texto livre mantidas (cast/description ficam de fora por padrão)
+        text_columns = cls.TEXT_COLUMNS if text_columns is None else text_columns
+        frame = pd.DataFrame({column: df[column] for column in text_columns})
+        for column in cls.CATEGORICAL_COLUMNS:
+            frame[column] = df[column].astype('category')
+        frame['release_year'] = df['release_year'].astype(np.int16)
+        frame['duration_minutes'], frame['duration_seasons'] = parse_durations(df['duration'])
+        return cls(frame,
+                   MultiValuedColumn.from_series(df['listed_in']),
+                   MultiValuedColumn.from_series(df['country']))
+    
+    @classmethod
+    def load(cls, csv_file, text_columns=None):
+        usecols = (cls.TEXT_COLUMNS if text_columns is None else text_columns) + \
+            cls.CATEGORICAL_COLUMNS + ['release_year', 'duration']
+        return cls.from_frame(pd.read_csv(csv_file, usecols=list(dict.fromkeys(usecols))), text_columns)
+    
+    def __len__(self):
+        return len(self.frame)
+    
+    def codes(self, column):
+        # Códigos inteiros de uma coluna categórica (-1 para ausente)
+        return self.frame[column].cat.codes.to_numpy()
+    
+    def memory_usage(self):
+        return int(self.frame.memory_usage(deep=True).sum()) + self.genres.nbytes() + self.countries.nbytes()
+
+class CatalogSnapshot:
+    # Snapshot colunar binário do catálogo, gerado uma única vez a partir do
+    # CSV. Cada coluna fica em seu próprio .npy, aberto com memory-map (sem
+    # cópia nem parsing); colunas de texto são codificadas por dicionário
+    # (códigos int32 + vocabulário JSON) e genres/countries ficam em CSR
+    
+    FORMAT_VERSION = 1
+    MULTI_VALUED = {'genres': 'listed_in', 'countries': 'country'}
+    
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != self.FORMAT_VERSION:
+            raise ValueError(f"Versão de snapshot incompatível em {path}")
+        self.rows = self.meta['rows']
+        self._vocab = {}
+    
+    @classmethod
+    def write(cls, csv_file, path):
+        # Converte o CSV em snapshot (conversão única)
+        df = pd.read_csv(csv_file)
+        os.makedirs(path, exist_ok=True)
+        columns = {}
+        for column in df.columns:
+            if pd.api.types.is_integer_dtype(df[column]):
+                np.save(os.path.join(path, f'{column}.npy'), df[column].to_numpy())
+                columns[column] = 'int'
+            else:
+                # Códigos gravados no dtype que o pandas usa para esse vocabulário,
+                # para que a leitura monte a categórica sem converter (e copiar)
+                codes, vocab = pd.factorize(df[column])
+                codes = pd.Categorical.from_codes(codes, vocab, validate=False).codes
+                np.save(os.path.join(path, f'{column}.codes.npy'), codes)
+                cls._write_json(os.path.join(path, f'{column}.vocab.json'), list(vocab))
+                columns[column] = 'dictionary'
         
-        print("✅ Análise MapReduce concluída!")
-        return self.results
+        # Durações já separadas; -1 indica ausente
+        for unit, values in zip(['minutes', 'seasons'], parse_durations(df['duration'])):
+            np.save(os.path.join(path, f'duration_{unit}.npy'), values.fillna(-1).to_numpy(dtype=np.int16))
+            columns[f'duration_{unit}'] = 'nullable_int'
+        
+        for name, column in cls.MULTI_VALUED.items():
+            multi = MultiValuedColumn.from_series(df[column])
+            np.save(os.path.join(path, f'{name}.offsets.npy'), multi.offsets)
+            np.save(os.path.join(path, f'{name}.codes.npy'), multi.codes)
+            cls._write_json(os.path.join(path, f'{name}.vocab.json'), multi.vocab)
+        
+        cls._write_json(os.path.join(path, 'meta.json'), {
+            'version': cls.FORMAT_VERSION,
+            'rows': len(df),
+            'columns': columns,
+            'source_fingerprint': file_fingerprint(csv_file),
+        })
+        print(f"💾 Snapshot colunar gravado em '{path}' ({len(df)} registros)")
+        return cls(path)
+    
+    @staticmethod
+    def _write_json(path, payload):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+    
+    def _array(self, name):
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+    
+    def vocab(self, name):
+        if name not in self._vocab:
+            with open(os.path.join(self.path, f'{name}.vocab.json'), encoding='utf-8') as f:
+                self._vocab[name] = json.load(f)
+        return self._vocab[name]
+    
+    def column(self, name, start=0, stop=None):
+        # Uma coluna (ou fatia de linhas) como Series; texto vira categórica
+        # sobre os códigos mapeados em memória
+        kind = self.meta['columns'][name]
+        if kind == 'dictionary':
+            codes = self._array(f'{name}.codes')[start:stop]
+            return pd.Series(pd.Categorical.from_codes(codes, self.vocab(name), validate=False),
+                             name=name, copy=False)
+        values = self._array(name)[start:stop]
+        if kind == 'nullable_int':
+            return pd.Series(pd.arrays.IntegerArray(np.asarray(values), np.asarray(values) < 0),
+                             name=name, copy=False)
+        return pd.Series(values, name=name, copy=False)
+    
+    def to_frame(self, columns=None, start=0, stop=None):
+        # Projeção de colunas: só os arquivos pedidos são abertos; copy=False
+        # mantém as colunas apoiadas no memory-map (dict copia por padrão)
+        columns = columns or list(self.meta['columns'])
+        return pd.DataFrame({column: self.column(column, start, stop) for column in columns}, copy=False)
+    
+    def iter_chunks(self, columns, chunksize):
+        for start in range(0, self.rows, chunksize):
+            yield self.to_frame(columns, start, min(start + chunksize, self.rows))
+    
+    def multi_valued(self, name):
+        return MultiValuedColumn(self._array(f'{name}.offsets'), self._array(f'{name}.codes'), self.vocab(name))
+    
+    def catalog(self, text_columns=None):
+        # CompactCatalog montado direto do snapshot, sem passar pelo CSV
+        text_columns = CompactCatalog.TEXT_COLUMNS if text_columns is None else text_columns
+        frame = self.to_frame(text_columns + CompactCatalog.CATEGORICAL_COLUMNS +
+                              ['release_year', 'duration_minutes', 'duration_seasons'])
+        return CompactCatalog(frame, self.multi_valued('genres'), self.multi_valued('countries'))
+
+class CatalogIndex:
+    # Índices invertidos sobre o CompactCatalog: cada gênero, país, rating,
+    # tipo e ano aponta para uma posting list (array ordenado de row ids
+    # int32). Consultas intersectam/unem as listas em vez de varrer o dataset
+    
+    FIELDS = ['type', 'genre', 'country', 'rating', 'year']
+    
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.postings = {
+            'genre': self._multi_valued_postings(catalog.genres),
+            'country': self._multi_valued_postings(catalog.countries),
+            'type': self._categorical_postings(catalog.frame['type']),
+            'rating': self._categorical_postings(catalog.frame['rating']),
+        }
+        # Anos: linhas ordenadas por ano, então uma faixa de anos é uma fatia contígua
+        years = catalog.frame['release_year'].to_numpy()
+        self.year_order = np.argsort(years, kind='stable').astype(np.int32)
+        self.sorted_years = years[self.year_order]
+    
+    @staticmethod
+    def _group_postings(keys, rows, vocab):
+        # Agrupa row ids por chave: ordena pares (chave, linha) e corta nas fronteiras
+        stride = int(rows.max(initial=0)) + 1
+        pairs = np.unique(keys.astype(np.int64) * stride + rows)
+        keys, rows = pairs // stride, (pairs % stride).astype(np.int32)
+        bounds = np.searchsorted(keys, np.arange(len(vocab) + 1))
+        return {value: rows[bounds[code]:bounds[code + 1]] for code, value in enumerate(vocab)}
+    
+    def _multi_valued_postings(self, column):
+        return self._group_postings(column.codes, column.row_ids(), column.vocab)
+    
+    def _categorical_postings(self, series):
+        codes = series.cat.codes.to_numpy()
+        rows = np.flatnonzero(codes >= 0).astype(np.int32)
+        return self._group_postings(codes[rows], rows, list(series.cat.categories))
+    
+    def _lookup(self, field, values):
+        # Posting list de um valor, ou união das listas se vier uma lista de valores
+        if isinstance(values, (list, tuple, set)):
+            lists = [self.postings[field].get(value, np.empty(0, dtype=np.int32)) for value in values]
+            return np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int32)
+        return self.postings[field].get(values, np.empty(0, dtype=np.int32))
+    
+    def year_range(self, year_from=None, year_to=None):
+        # Linhas com release_year em [year_from, year_to]
+        start = 0 if year_from is None else np.searchsorted(self.sorted_years, year_from, side='left')
+        stop = len(self.sorted_years) if year_to is None else np.searchsorted(self.sorted_years, year_to, side='right')
+        return np.sort(self.year_order[start:stop])
+    
+    def query(self, type=None, genre=None, country=None, rating=None, year=None, year_from=None, year_to=None):
+        # Row ids que satisfazem todos os filtros informados; cada filtro aceita
+        # um valor ou uma lista de valores (união)
+        filters = {'type': type, 'genre': genre, 'country': country, 'rating': rating}
+        lists = [self._lookup(field, value) for field, value in filters.items() if value is not None]
+        if year is not None:
+            year_from = year_to = year
+        if year_from is not None or year_to is not None:
+            lists.append(self.year_range(year_from, year_to))
+        if not lists:
+            return np.arange(len(self.catalog), dtype=np.int32)
+        
+        # Interseção começando pela lista mais curta
+        lists.sort(key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+    
+    def count(self, **filters):
+        return len(self.query(**filters))
+    
+    def titles(self, rows, columns=('show_id', 'title')):
+        # Linhas do catálogo correspondentes aos row ids de uma consulta
+        return self.catalog.frame.iloc[rows][list(columns)]
+
+class RankedView:
+    # Visão ordenada de um Counter, calculada uma única vez: mesma ordem do
+    # sorted(..., key=count, reverse=True) estável e rank em O(1) por chave
+    
+    def __init__(self, counts):
+        self.items = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+        self.positions = {key: position for position, (key, _) in enumerate(self.items)}
+    
+    def top(self, k=None):
+        return self.items[:k]
+    
+    def rank(self, key):
+        # (posição 1-based, contagem) da chave, ou None se ausente
+        position = self.positions.get(key)
+        if position is None:
+            return None
+        return position + 1, self.items[position][1]
+    
+    def __len__(self):
+        return len(self.items)
+
+class AggregateCube:
+    # Cubo de contagens pré-calculado sobre (tipo × gênero × país × rating × ano).
+    # As marginais globais e por tipo vêm dos resultados do MapReduce e ficam
+    # em RankedViews cacheadas; cruzamentos arbitrários usam duas tabelas de
+    # células montadas a partir do CompactCatalog (por título e por título×gênero).
+    # Como no map_type_analysis, 'country' é o primeiro país listado no título
+    
+    DIMENSIONS = ['type', 'genre', 'country', 'rating', 'year']
+    
+    def __init__(self, results, catalog=None):
+        self.results = results
+        self.catalog = catalog
+        self._views = {}
+        self._cells = None
+    
+    def ranked(self, field, content_type=None):
+        # RankedView de results[field] ou de type_analysis[content_type][field]
+        key = (field, content_type)
+        if key not in self._views:
+            source = self.results[field] if content_type is None else \
+                self.results['type_analysis'][content_type][field]
+            self._views[key] = RankedView(source)
+        return self._views[key]
+    
+    def cells(self):
+        # Tabelas de células (contagem por combinação de dimensões), montadas sob demanda
+        if self._cells is None:
+            if self.catalog is None:
+                raise ValueError("O cubo precisa de um CompactCatalog para cruzamentos por segmento")
+            frame = self.catalog.frame
+            countries = self.catalog.countries
+            has_country = np.diff(countries.offsets) > 0
+            first_country = np.full(len(frame), -1, dtype=np.int64)
+            first_country[has_country] = countries.codes[countries.offsets[:-1][has_country]]
+            titles = pd.DataFrame({
+                'type': frame['type'].astype(object).to_numpy(),
+                'country': np.array(countries.vocab + ['Unknown'], dtype=object)[first_country],
+                'rating': frame['rating'].astype(object).fillna('Unknown').to_numpy(),
+                'year': frame['release_year'].to_numpy(),
+            })
+            genre_rows = self.catalog.genres.row_ids()
+            genres = titles.iloc[genre_rows].reset_index(drop=True)
+            genres.insert(1, 'genre', np.array(self.catalog.genres.vocab, dtype=object)[self.catalog.genres.codes])
+            
+            # Durações (minutos para filmes, temporadas para séries) somadas por
+            # célula para que médias por segmento saiam de somas pré-calculadas
+            titles['duration'] = frame['duration_minutes'].fillna(frame['duration_seasons']).astype('float64')
+            dimensions = ['type', 'country', 'rating', 'year']
+            self._cells = {
+                'titles': titles.groupby(dimensions, sort=False).agg(
+                    count=('year', 'size'),
+                    duration_sum=('duration', 'sum'),
+                    duration_n=('duration', 'count'),
+                ).reset_index(),
+                'genres': genres.groupby(list(genres.columns), sort=False).size().rename('count').reset_index(),
+            }
+        return self._cells
+    
+    def _segment(self, table, filters):
+        # Células de um segmento; filtros aceitam valor, lista de valores ou,
+        # para ano, year_from/year_to
+        cells = self.cells()[table]
+        mask = np.ones(len(cells), dtype=bool)
+        year_from = filters.pop('year_from', None)
+        year_to = filters.pop('year_to', None)
+        for dimension, value in filters.items():
+            if value is None:
+                continue
+            column = cells[dimension]
+            mask &= column.isin(value).to_numpy() if isinstance(value, (list, tuple, set)) else (column == value).to_numpy()
+        if year_from is not None:
+            mask &= cells['year'].to_numpy() >= year_from
+        if year_to is not None:
+            mask &= cells['year'].to_numpy() <= year_to
+        return cells[mask]
+    
+    def count(self, **filters):
+        # Número de títulos no segmento (com filtro de gênero, títulos×gênero)
+        table = 'genres' if filters.get('genre') is not None else 'titles'
+        return int(self._segment(table, filters)['count'].sum())
+    
+    def ranked_segment(self, field, **filters):
+        # RankedView de uma dimensão dentro de um segmento, ex.:
+        # ranked_segment('genre', type='TV Show', country='India')
+        table = 'genres' if field == 'genre' or filters.get('genre') is not None else 'titles'
+        totals = self._segment(table, filters).groupby(field, sort=False)['count'].sum()
+        return RankedView(dict(zip(totals.index.tolist(), totals.tolist())))
+
+class CatalogTimeline:
+    # Séries mensais de títulos adicionados (date_added) por gênero, país,
+    # rating e tipo. As contagens ficam em matrizes (chave × mês) acumuladas
+    # em prefix sums, então qualquer janela [início, fim] é uma subtração de
+    # duas colunas: O(1) por chave, sem refiltrar Counters a cada consulta.
+    # Meses são rotulados 'AAAA-MM'; janelas recebem rótulos inclusivos
+    
+    COLUMNS = ['type', 'country', 'date_added', 'rating', 'listed_in']
+    DIMENSIONS = {'genre': 'listed_in', 'country': 'country', 'rating': 'rating', 'type': 'type'}
+    MULTI_VALUED = {'listed_in', 'country'}
+    
+    def __init__(self, first_month, months, keys, prefix):
+        # first_month: mês absoluto (ano * 12 + mês - 1) da primeira coluna
+        # keys[dimensão]: valores na ordem de primeira ocorrência
+        # prefix[dimensão]: int64 (chaves × months + 1); coluna t = soma dos meses < t
+        self.first_month = first_month
+        self.months = months
+        self.keys = keys
+        self.positions = {dimension: {key: i for i, key in enumerate(values)} for dimension, values in keys.items()}
+        self.prefix = prefix
+    
+    @classmethod
+    def from_frame(cls, df):
+        # Índice posicional: month[] é indexado pelos rótulos após o explode,
+        # então frames filtrados ou com outro índice são renumerados
+        df = df.reset_index(drop=True)
+        added = parse_date_added(df['date_added'])
+        valid = added.notna().to_numpy()
+        absolute = (added.dt.year * 12 + added.dt.month - 1).to_numpy(dtype='float64')
+        first_month = int(np.nanmin(absolute)) if valid.any() else 0
+        months = int(np.nanmax(absolute)) - first_month + 1 if valid.any() else 0
+        month = np.where(valid, absolute - first_month, -1).astype(np.int64)
+        
+        keys, prefix = {}, {}
+        for dimension, column in cls.DIMENSIONS.items():
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(object)
+            values = values[valid]
+            if column in cls.MULTI_VALUED:
+                values = values.dropna().str.split(',').explode().str.strip()
+            else:
+                values = values.dropna()
+            codes, vocab = pd.factorize(values, sort=False)
+            counts = np.bincount(codes * months + month[values.index.to_numpy()],
+                                 minlength=len(vocab) * months).reshape(len(vocab), months)
+            table = np.zeros((len(vocab), months + 1), dtype=np.int64)
+            np.cumsum(counts, axis=1, out=table[:, 1:])
+            keys[dimension] = vocab.tolist()
+            prefix[dimension] = table
+        return cls(first_month, months, keys, prefix)
+    
+    @classmethod
+    def from_csv(cls, csv_file):
+        return cls.from_frame(pd.read_csv(csv_file, usecols=cls.COLUMNS))
+    
+    def label(self, month):
+        # Índice relativo -> 'AAAA-MM'
+        year, month = divmod(self.first_month + month, 12)
+        return f"{year}-{month + 1:02d}"
+    
+    def labels(self, months):
+        return [self.label(month) for month in months]
+    
+    def month(self, label):
+        # 'AAAA-MM' (ou 'AAAA', que vale janeiro) -> índice relativo; pode cair
+        # fora de [0, months) para meses antes ou depois do catálogo
+        year, _, month = str(label).partition('-')
+        return int(year) * 12 + (int(month) - 1 if month else 0) - self.first_month
+    
+    def _column(self, month):
+        # Índice relativo -> coluna das prefix sums, limitada a [0, months]
+        return min(max(month, 0), self.months)
+    
+    def _bounds(self, start, end):
+        # Rótulos inclusivos -> colunas [início, fim) das prefix sums; janelas
+        # fora do catálogo viram intervalos vazios (início == fim)
+        start = 0 if start is None else self._column(self.month(start))
+        stop = self.months if end is None else self._column(self.month(end) + 1)
+        return start, max(stop, start)
+    
+    def window_counts(self, dimension, start=None, end=None):
+        # {chave: títulos adicionados entre start e end}, só chaves com contagem > 0
+        start, stop = self._bounds(start, end)
+        counts = self.prefix[dimension][:, stop] - self.prefix[dimension][:, start]
+        nonzero = np.flatnonzero(counts)
+        return dict(zip([self.keys[dimension][i] for i in nonzero], counts[nonzero].tolist()))
+    
+    def count(self, dimension, key, start=None, end=None):
+        row = self.positions[dimension].get(key)
+        if row is None:
+            return 0
+        start, stop = self._bounds(start, end)
+        return int(self.prefix[dimension][row, stop] - self.prefix[dimension][row, start])
+    
+    def top(self, dimension, start=None, end=None, k=10):
+        return RankedView(self.window_counts(dimension, start, end)).top(k)
+    
+    def _frame(self, dimension, values, columns, keys=None):
+        frame = pd.DataFrame(values, index=pd.Index(self.keys[dimension], name=dimension), columns=columns)
+        return frame if keys is None else frame.loc[list(keys)]
+    
+    def rolling(self, dimension, window=3, keys=None):
+        # Janelas deslizantes de `window` meses; a coluna é o último mês da janela
+        prefix = self.prefix[dimension]
+        if window > self.months:
+            return self._frame(dimension, np.zeros((len(prefix), 0), dtype=np.int64), [], keys)
+        counts = prefix[:, window:] - prefix[:, :-window]
+        return self._frame(dimension, counts, self.labels(range(window - 1, self.months)), keys)
+    
+    def tumbling(self, dimension, window=12, keys=None):
+        # Janelas fixas de `window` meses alinhadas ao calendário (12 = anos,
+        # 3 = trimestres); a coluna é o primeiro mês da janela
+        first = self.first_month - self.first_month % window
+        edges = np.arange(first, self.first_month + self.months + window, window) - self.first_month
+        edges = np.unique(np.clip(edges, 0, self.months))
+        counts = self.prefix[dimension][:, edges[1:]] - self.prefix[dimension][:, edges[:-1]]
+        return self._frame(dimension, counts, self.labels(edges[:-1]), keys)
+    
+    def growth(self, dimension, window=12, end=None):
+        # Crescimento da janela de `window` meses terminada em end (padrão: último
+        # mês) sobre a janela anterior do mesmo tamanho; NaN quando não havia títulos
+        stop = self.months if end is None else self.month(end) + 1
+        stop, middle, start = (self._column(column) for column in (stop, stop - window, stop - 2 * window))
+        prefix = self.prefix[dimension]
+        current = prefix[:, stop] - prefix[:, middle]
+        previous = prefix[:, middle] - prefix[:, start]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(previous > 0, (current - previous) / np.maximum(previous, 1), np.nan)
+        frame = self._frame(dimension, {'current': current, 'previous': previous, 'growth': rate},
+                            ['current', 'previous', 'growth'])
+        return frame.sort_values('current', ascending=False, kind='stable')
+
+class SimilarTitlesEngine:
+    # Similaridade item-a-item baseada em conteúdo. Cada título vira um vetor
+    # esparso: multi-hot de gêneros/elenco/direção/país + TF-IDF da descrição,
+    # normalizado (cosseno). Os vetores ficam em CSR (por título) e CSC (por
+    # feature); o top-k de um bloco de títulos sai de um produto esparso ×
+    # esparso que só gera os pares com alguma feature em comum
+    
+    MULTI_VALUED_FEATURES = {'genre': 'listed_in', 'cast': 'cast', 'director': 'director', 'country': 'country'}
+    DEFAULT_WEIGHTS = {'genre': 1.0, 'cast': 0.5, 'director': 0.75, 'country': 0.5, 'description': 1.0}
+    # Pares (título, vizinho) por bloco do produto esparso; blocos que cabem
+    # no cache são mais rápidos que blocos do tamanho do memory_budget
+    BLOCK_PAIRS = 1 << 17
+    STOPWORDS = frozenset("""
+        the and for with his her their its this that from into who when while after before
+        about over under them they she him has have had are was were will not but all one
+        two out must what new own can find finds more most than then also only just where
+        which whose there these those being been becomes become through between each other
+        """.split())
+    
+    def __init__(self, df, weights=None, memory_budget=256 << 20):
+        self.show_ids = df['show_id'].astype(object).to_numpy()
+        self.titles = df['title'].astype(object).to_numpy()
+        self.row_of = {show_id: row for row, show_id in enumerate(self.show_ids)}
+        self.weights = dict(self.DEFAULT_WEIGHTS, **(weights or {}))
+        self.memory_budget = memory_budget
+        self._build(df.reset_index(drop=True))
+    
+    @classmethod
+    def from_csv(cls, csv_file, **kwargs):
+        columns = ['show_id', 'title', 'description'] + list(cls.MULTI_VALUED_FEATURES.values())
+        return cls(pd.read_csv(csv_file, usecols=columns), **kwargs)
+    
+    def _build(self, df):
+        n = len(df)
+        rows, codes, values, names = [], [], [], []
+        
+        # Multi-hot das colunas multivaloradas. Os ids vêm de pd.factorize:
+        # só os nomes distintos viram strings 'prefixo:valor'
+        for prefix, column in self.MULTI_VALUED_FEATURES.items():
+            exploded = df[column].dropna().astype(object).str.split(',').explode().str.strip()
+            exploded = exploded[exploded != '']
+            feature_codes, uniques = pd.factorize(exploded)
+            rows.append(exploded.index.to_numpy())
+            codes.append(feature_codes + sum(len(block) for block in names))
+            values.append(np.full(len(exploded), self.weights[prefix]))
+            names.append(prefix + ':' + pd.Index(uniques).astype(object))
+        
+        # TF-IDF da descrição (tokens com 3+ letras, sem stopwords). Cada
+        # token vira um id (ordem alfabética) e a contagem (título, termo) é
+        # feita sobre chaves inteiras
+        tokens = df['description'].fillna('').astype(object).str.lower().str.findall(r"[a-z][a-z']{2,}").explode().dropna()
+        tokens = tokens[~tokens.isin(self.STOPWORDS)]
+        token_codes, vocabulary = pd.factorize(tokens, sort=True)
+        pairs, tf = np.unique(tokens.index.to_numpy().astype(np.int64) * len(vocabulary) + token_codes,
+                              return_counts=True)
+        token_rows, token_ids = np.divmod(pairs, len(vocabulary))
+        document_frequency = np.bincount(token_ids, minlength=len(vocabulary))
+        idf = np.log((1 + n) / (1 + document_frequency)) + 1
+        tfidf = tf * idf[token_ids]
+        # Normaliza o bloco de descrição por título antes de aplicar o peso
+        norms = np.sqrt(np.bincount(token_rows, weights=tfidf ** 2, minlength=n))
+        # Ids dos termos na ordem de primeira aparição entre as features, como nos outros blocos
+        token_ids, used = pd.factorize(token_ids)
+        rows.append(token_rows)
+        codes.append(token_ids + sum(len(block) for block in names))
+        values.append(self.weights['description'] * tfidf / norms[token_rows])
+        names.append('desc:' + pd.Index(vocabulary[used]).astype(object))
+        
+        rows = np.concatenate(rows).astype(np.int64)
+        codes = np.concatenate(codes).astype(np.int64)
+        self.feature_names = np.concatenate([block.to_numpy() for block in names])
+        values = np.concatenate(values).astype(np.float32)
+        
+        # Normalização L2 por título: produto interno = similaridade cosseno
+        norms = np.sqrt(np.bincount(rows, weights=values.astype(np.float64) ** 2, minlength=n))
+        values = values / np.where(norms > 0, norms, 1)[rows].astype(np.float32)
+        
+        self.n = n
+        self.csr_indptr, self.csr_indices, self.csr_data = self._compress(rows, codes, values, n)
+        self.csc_indptr, self.csc_indices, self.csc_data = self._compress(codes, rows, values, len(self.feature_names))
+    
+    @staticmethod
+    def _compress(major, minor, values, size):
+        # Ordena triplas (major, minor, valor) em formato comprimido por major
+        order = np.lexsort((minor, major))
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(major, minlength=size), out=indptr[1:])
+        return indptr, minor[order].astype(np.int32), values[order]
+    
+    @staticmethod
+    def _expand(indptr, majors):
+        # Posições de todas as entradas das fatias indptr[m]:indptr[m + 1]
+        starts = indptr[majors]
+        lengths = indptr[majors + 1] - starts
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return offsets + np.arange(lengths.sum()), lengths
+    
+    def _block_pairs(self, block_rows):
+        # Produto esparso × esparso de um bloco de títulos contra o catálogo:
+        # só os pares com alguma feature em comum, como (dono no bloco, alvo, score)
+        positions, lengths = self._expand(self.csr_indptr, block_rows)
+        query_features = self.csr_indices[positions]
+        matches, match_lengths = self._expand(self.csc_indptr, query_features)
+        owners = np.repeat(np.repeat(np.arange(len(block_rows)), lengths), match_lengths)
+        keys = owners * self.n + self.csc_indices[matches]
+        weights = np.repeat(self.csr_data[positions], match_lengths).astype(np.float64) * self.csc_data[matches]
+        # Soma os produtos de cada par (dono, alvo): ordena as chaves e reduz por segmento
+        order = np.argsort(keys)
+        keys, weights = keys[order], weights[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))) if len(keys) else np.empty(0, dtype=np.int64)
+        scores = np.add.reduceat(weights, starts) if len(keys) else np.empty(0)
+        owners, targets = np.divmod(keys[starts], self.n)
+        keep = targets != block_rows[owners]  # o próprio título não conta
+        return owners[keep], targets[keep], scores[keep]
+    
+    def _block_top_k(self, block_rows, k):
+        # Top-k de cada título do bloco a partir dos pares esparsos; empates
+        # ficam com o menor índice. Títulos com menos de k vizinhos em comum
+        # são completados com títulos de score 0, como numa matriz densa
+        owners, targets, scores = self._block_pairs(block_rows)
+        # Pré-seleção: ordem aproximada pelo score em float32 (bits de um float
+        # não negativo crescem com o valor) dá o k-ésimo de cada dono; só os
+        # pares com score float32 ≥ esse limite podem estar no top-k exato
+        ranking = (owners << 32) | (~scores.astype(np.float32).view(np.uint32)).astype(np.int64)
+        ranked = np.sort(ranking)
+        starts = np.searchsorted(ranked, np.arange(len(block_rows) + 1, dtype=np.int64) << 32)
+        limits = ranked[np.maximum(np.minimum(starts[:-1] + k, starts[1:]) - 1, 0)] if len(ranked) else ranked
+        shortlist = np.flatnonzero(ranking <= limits[owners])
+        owners, targets, scores = owners[shortlist], targets[shortlist], scores[shortlist]
+        order = np.lexsort((targets, -scores, owners))
+        owners, targets, scores = owners[order], targets[order], scores[order]
+        ranks = np.arange(len(owners)) - np.searchsorted(owners, np.arange(len(block_rows)))[owners]
+        keep = ranks < k
+        neighbours = np.full((len(block_rows), k), -1, dtype=np.int64)
+        similarities = np.zeros((len(block_rows), k), dtype=np.float64)
+        neighbours[owners[keep], ranks[keep]] = targets[keep]
+        similarities[owners[keep], ranks[keep]] = scores[keep]
+        for local in np.flatnonzero(neighbours[:, -1] < 0).tolist():
+            taken = set(neighbours[local].tolist()) | {int(block_rows[local])}
+            missing = np.flatnonzero(neighbours[local] < 0)
+            fillers = (row for row in range(self.n) if row not in taken)
+            neighbours[local, missing] = [next(fillers) for _ in missing]
+        return neighbours, similarities
+    
+    def block_bounds(self):
+        # Limites dos blocos de títulos: cada bloco gera até BLOCK_PAIRS pares
+        # intermediários (~32 bytes cada, dentro do memory_budget), sem matriz densa B×n
+        feature_lengths = np.diff(self.csc_indptr)
+        entry_rows = np.repeat(np.arange(self.n), np.diff(self.csr_indptr))
+        row_pairs = np.bincount(entry_rows, weights=feature_lengths[self.csr_indices], minlength=self.n)
+        cumulative = np.cumsum(row_pairs)
+        max_pairs = max(1, min(self.BLOCK_PAIRS, self.memory_budget // 32))
+        cuts = np.searchsorted(cumulative, np.arange(max_pairs, cumulative[-1] if self.n else 0, max_pairs), side='right')
+        return np.unique(np.concatenate(([0], cuts, [self.n])))
+    
+    def similar(self, show_id, k=10):
+        # Top-k títulos mais parecidos com show_id: [(show_id, title, score), ...]
+        k = min(k, self.n - 1)
+        neighbours, scores = self._block_top_k(np.array([self.row_of[show_id]]), k)
+        return [(self.show_ids[i], self.titles[i], float(score)) for i, score in zip(neighbours[0], scores[0])]
+    
+    def all_top_k(self, k=10):
+        # Top-k para todos os títulos, em blocos de memória limitada.
+        # Retorna (vizinhos, scores), ambos com shape (n, k)
+        k = min(k, self.n - 1)
+        neighbours = np.empty((self.n, k), dtype=np.int32)
+        similarities = np.empty((self.n, k), dtype=np.float32)
+        bounds = self.block_bounds()
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            block = np.arange(start, stop)
+            neighbours[block], similarities[block] = self._block_top_k(block, k)
+        return neighbours, similarities
+
+class PairCountAccumulator:
+    # Acumulador esparso de contagens de pares (a, b) com a < b, codificados em
+    # um int64 (a << 32 | b). Cada lote é ordenado e agregado sozinho e depois
+    # intercalado ao run ordenado em memória; ao passar de max_pairs chaves
+    # distintas o run é despejado em disco. finalize() mescla os runs por faixas de chave, então
+    # o pico de memória do merge também fica limitado. Cada par guarda também
+    # o número de sequência da sua primeira emissão (mínimo entre os lotes),
+    # que permite devolver os pares na ordem de primeira ocorrência
+    
+    ARRAYS = ['keys', 'counts', 'first']
+    
+    def __init__(self, max_pairs=5_000_000, spill_dir=None):
+        self.max_pairs = max_pairs
+        self.spill_dir = spill_dir
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.first = np.empty(0, dtype=np.int64)
+        self.runs = []
+        self.files = []
+        self._temporary_dir = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+    
+    @staticmethod
+    def _sum_sorted(keys, counts, first):
+        # Soma contagens de chaves repetidas e mantém a menor sequência (keys precisa estar ordenado)
+        if len(keys) == 0:
+            return keys, counts, first
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        return keys[starts], np.add.reduceat(counts, starts), np.minimum.reduceat(first, starts)
+    
+    def add(self, keys, first, counts=None):
+        # first: número de sequência de cada emissão de keys. Só o lote é
+        # ordenado (O(n log n) no tamanho do lote); chaves já presentes no run
+        # são somadas no lugar e as novas são inseridas nas posições ordenadas
+        counts = np.ones(len(keys), dtype=np.int64) if counts is None else counts
+        order = np.argsort(keys, kind='stable')
+        keys, counts, first = self._sum_sorted(keys[order], counts[order], first[order])
+        position = np.searchsorted(self.keys, keys)
+        found = position < len(self.keys)
+        found[found] = self.keys[position[found]] == keys[found]
+        existing = position[found]
+        self.counts[existing] += counts[found]
+        self.first[existing] = np.minimum(self.first[existing], first[found])
+        new = ~found
+        self.keys = np.insert(self.keys, position[new], keys[new])
+        self.counts = np.insert(self.counts, position[new], counts[new])
+        self.first = np.insert(self.first, position[new], first[new])
+        if len(self.keys) > self.max_pairs:
+            self._spill()
+    
+    def _spill(self):
+        if self.spill_dir is None:
+            self.spill_dir = self._temporary_dir = tempfile.mkdtemp(prefix='netflix_pairs_')
+        path = os.path.join(self.spill_dir, f'run_{id(self)}_{len(self.runs)}')
+        for name in self.ARRAYS:
+            np.save(f'{path}.{name}.npy', getattr(self, name))
+            self.files.append(f'{path}.{name}.npy')
+        self.runs.append(path)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.first = np.empty(0, dtype=np.int64)
+    
+    def finalize(self, ranges=64):
+        # Retorna (keys, counts, first) ordenados por chave; com runs em disco, o
+        # resultado final também é gravado em disco e aberto com memory-map
+        # (válido até close())
+        if not self.runs:
+            return self.keys, self.counts, self.first
+        self._spill()
+        runs = [[np.load(f'{path}.{name}.npy', mmap_mode='r') for name in self.ARRAYS] for path in self.runs]
+        samples = np.concatenate([keys[::max(1, len(keys) // ranges)] for keys, _, _ in runs])
+        bounds = np.unique(np.quantile(samples, np.linspace(0, 1, ranges + 1)[1:-1]).astype(np.int64))
+        bounds = np.concatenate(([np.iinfo(np.int64).min], bounds, [np.iinfo(np.int64).max]))
+        
+        output = os.path.join(self.spill_dir, f'merged_{id(self)}')
+        outputs = [f'{output}.{name}' for name in self.ARRAYS]
+        self.files.extend(outputs)
+        total = 0
+        with contextlib.ExitStack() as stack:
+            files = [stack.enter_context(open(path, 'wb')) for path in outputs]
+            for low, high in zip(bounds[:-1], bounds[1:]):
+                parts = []
+                for keys, counts, first in runs:
+                    start, stop = np.searchsorted(keys, [low, high], side='left')
+                    parts.append((keys[start:stop], counts[start:stop], first[start:stop]))
+                keys, counts, first = (np.concatenate(column) for column in zip(*parts))
+                order = np.argsort(keys, kind='stable')
+                merged = self._sum_sorted(keys[order], counts[order], first[order])
+                for f, values in zip(files, merged):
+                    f.write(values.tobytes())
+                total += len(merged[0])
+        if total == 0:
+            return tuple(np.empty(0, dtype=np.int64) for _ in self.ARRAYS)
+        return tuple(np.memmap(path, dtype=np.int64, mode='r', shape=(total,)) for path in outputs)
+    
+    def allocate(self, name, dtype, size):
+        # Array de saída derivado do resultado: em memória ou, se houve despejo,
+        # em disco (memory-map), removido junto com os runs em close()
+        if not self.runs:
+            return np.empty(size, dtype=dtype)
+        path = os.path.join(self.spill_dir, f'{name}_{id(self)}')
+        self.files.append(path)
+        return np.memmap(path, dtype=dtype, mode='w+', shape=(max(size, 1),))[:size]
+    
+    def close(self):
+        # Remove os runs e o resultado mesclado gravados em disco
+        for path in self.files:
+            if os.path.exists(path):
+                os.remove(path)
+        if self._temporary_dir is not None:
+            shutil.rmtree(self._temporary_dir, ignore_errors=True)
+            self.spill_dir = self._temporary_dir = None
+        self.runs = []
+        self.files = []
+
+class CollaborationGraph:
+    # Grafo de coautoria entre pessoas (elenco e direção): aresta entre dois
+    # nomes que dividiram um título, com peso = número de títulos em comum.
+    # A construção gera pares por chunk de forma vetorizada e os acumula em
+    # um PairCountAccumulator (com despejo em disco se necessário). Com despejo,
+    # keys/counts e a adjacência ficam em arquivos mapeados até close() (ou o
+    # fim do bloco with)
+    
+    ADJACENCY_BLOCK = 1 << 20  # arestas lidas por vez na montagem do CSR
+    
+    def __init__(self, names, keys, counts, first=None, accumulator=None):
+        self.names = names
+        self.node_of = {name: node for node, name in enumerate(names)}
+        self.keys = keys
+        self.counts = counts
+        self.first = first
+        self.accumulator = accumulator
+        self._build_adjacency()
+        self._components = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+    
+    def close(self):
+        # Remove os arquivos do acumulador; o grafo não deve ser usado depois
+        if self.accumulator is not None:
+            self.keys = self.counts = self.first = self.neighbours = self.weights = None
+            self.accumulator.close()
+            self.accumulator = None
+    
+    @classmethod
+    def count_pairs(cls, frames, max_pairs=5_000_000, spill_dir=None):
+        # Só a contagem dos pares, sem adjacência: (nomes, acumulador, (keys, counts, first)).
+        # Quem chama é dono do acumulador e deve fechá-lo
+        node_of = {}
+        accumulator = PairCountAccumulator(max_pairs, spill_dir)
+        sequence = 0
+        try:
+            for frame in frames:
+                keys = cls._chunk_pairs(frame.reset_index(drop=True), node_of)
+                accumulator.add(keys, np.arange(sequence, sequence + len(keys), dtype=np.int64))
+                sequence += len(keys)
+            arrays = accumulator.finalize()
+        except BaseException:
+            accumulator.close()
+            raise
+        names = [None] * len(node_of)
+        for name, node in node_of.items():
+            names[node] = name
+        return names, accumulator, arrays
+    
+    @classmethod
+    def build(cls, frames, max_pairs=5_000_000, spill_dir=None):
+        # frames: iterável de DataFrames com as colunas cast e director
+        names, accumulator, (keys, counts, first) = cls.count_pairs(frames, max_pairs, spill_dir)
+        try:
+            return cls(names, keys, counts, first, accumulator)
+        except BaseException:
+            accumulator.close()
+            raise
+    
+    @staticmethod
+    def _frame_chunks(df, chunksize):
+        return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    
+    @classmethod
+    def from_frame(cls, df, chunksize=50000, **kwargs):
+        return cls.build(cls._frame_chunks(df, chunksize), **kwargs)
+    
+    @classmethod
+    def pair_counts_from_frame(cls, df, chunksize=50000, **kwargs):
+        # pair_counts() direto do acumulador, sem montar o grafo
+        names, accumulator, (keys, counts, first) = cls.count_pairs(cls._frame_chunks(df, chunksize), **kwargs)
+        with accumulator:
+            return cls._pair_dict(names, keys, counts, first)
+    
+    @classmethod
+    def from_csv(cls, csv_file, chunksize=50000, **kwargs):
+        return cls.build(pd.read_csv(csv_file, usecols=['cast', 'director'], chunksize=chunksize), **kwargs)
+    
+    @staticmethod
+    def _people(series, node_of):
+        # (linha, id da pessoa, posição na linha) para uma coluna de nomes separados por vírgula
+        names = series.dropna().astype(object).str.split(',').explode().str.strip()
+        names = names[names != '']
+        for name in names.drop_duplicates():
+            node_of.setdefault(name, len(node_of))
+        people = pd.DataFrame({'row': names.index.to_numpy(), 'node': names.map(node_of).to_numpy(np.int64)})
+        people = people.drop_duplicates()
+        people['position'] = people.groupby('row').cumcount()
+        return people
+    
+    @classmethod
+    def _chunk_pairs(cls, frame, node_of):
+        # Pares ator–ator (a < b) e ator–diretor de um chunk, como chaves int64,
+        # na mesma ordem de emissão do map_collaborations: por linha, primeiro
+        # os pares do elenco e depois os pares elenco–direção
+        cast = cls._people(frame['cast'], node_of)
+        directors = cls._people(frame['director'], node_of)
+        cast_pairs = cast.merge(cast, on='row')
+        cast_pairs = cast_pairs[cast_pairs['position_x'] < cast_pairs['position_y']]
+        pairs = pd.concat([cast_pairs.assign(section=0), cast.merge(directors, on='row').assign(section=1)],
+                          ignore_index=True)
+        a, b = pairs['node_x'].to_numpy(), pairs['node_y'].to_numpy()
+        keep = a != b
+        pairs = pd.DataFrame({
+            'row': pairs['row'].to_numpy()[keep],
+            'section': pairs['section'].to_numpy()[keep],
+            'i': pairs['position_x'].to_numpy()[keep],
+            'j': pairs['position_y'].to_numpy()[keep],
+            'key': np.minimum(a, b)[keep] << 32 | np.maximum(a, b)[keep],
+        })
+        # Um mesmo par pode surgir mais de uma vez no título (ex.: ator que também dirige)
+        pairs = pairs.sort_values(['row', 'section', 'i', 'j'], kind='stable').drop_duplicates(['row', 'key'])
+        return pairs['key'].to_numpy()
+    
+    def _edge_blocks(self):
+        # (low, high, counts) em blocos de ADJACENCY_BLOCK arestas, sem carregar todas
+        for start in range(0, len(self.keys), self.ADJACENCY_BLOCK):
+            keys = np.asarray(self.keys[start:start + self.ADJACENCY_BLOCK])
+            yield keys >> 32, keys & 0xFFFFFFFF, np.asarray(self.counts[start:start + self.ADJACENCY_BLOCK])
+    
+    def _build_adjacency(self):
+        # CSR simétrico: vizinhos de cada pessoa com o peso da aresta. As arestas
+        # são lidas em blocos (podem estar em disco): uma passada conta os graus
+        # e monta indptr, outras duas preenchem neighbours/weights. Cada pessoa
+        # recebe primeiro as arestas em que é o menor id e depois as demais, em
+        # ordem de chave
+        n = len(self.names)
+        degree = np.zeros(n, dtype=np.int64)
+        for low, high, _ in self._edge_blocks():
+            degree += np.bincount(low, minlength=n) + np.bincount(high, minlength=n)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degree, out=self.indptr[1:])
+        
+        total = int(self.indptr[-1])
+        allocate = self.accumulator.allocate if self.accumulator is not None else \
+            (lambda name, dtype, size: np.empty(size, dtype=dtype))
+        self.neighbours = allocate('neighbours', np.int32, total)
+        self.weights = allocate('weights', np.int64, total)
+        cursor = self.indptr[:-1].copy()
+        for side in range(2):
+            for low, high, counts in self._edge_blocks():
+                source, target = (low, high) if side == 0 else (high, low)
+                order = np.argsort(source, kind='stable')
+                source, target, counts = source[order], target[order], counts[order]
+                # Posição de cada aresta dentro do grupo da sua pessoa no bloco
+                rank = np.arange(len(source)) - np.searchsorted(source, source, side='left')
+                position = cursor[source] + rank
+                self.neighbours[position] = target
+                self.weights[position] = counts
+                cursor += np.bincount(source, minlength=n)
+    
+    def pair_counts(self):
+        # {(nome_a, nome_b): títulos em comum}, com nomes em ordem alfabética e
+        # pares na ordem de primeira ocorrência (como nos demais modos)
+        return self._pair_dict(self.names, self.keys, self.counts, self.first)
+    
+    @staticmethod
+    def _pair_dict(names, keys, counts, first=None):
+        keys, counts = np.asarray(keys), np.asarray(counts)
+        if first is not None:
+            order = np.argsort(first, kind='stable')
+            keys, counts = keys[order], counts[order]
+        pairs = {}
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            a, b = names[key >> 32], names[key & 0xFFFFFFFF]
+            pairs[(a, b) if a < b else (b, a)] = count
+        return pairs
+    
+    def degree(self, name):
+        # Número de colaboradores distintos
+        node = self.node_of[name]
+        return int(self.indptr[node + 1] - self.indptr[node])
+    
+    def top_collaborators(self, name, k=10):
+        # [(colaborador, títulos em comum), ...] em ordem decrescente
+        node = self.node_of[name]
+        start, stop = self.indptr[node], self.indptr[node + 1]
+        order = np.argsort(-self.weights[start:stop], kind='stable')[:k]
+        return [(self.names[self.neighbours[start + i]], int(self.weights[start + i])) for i in order]
+    
+    def connected_components(self):
+        # Rótulo do componente de cada pessoa (propagação do menor id + pointer jumping)
+        if self._components is None:
+            labels = np.arange(len(self.names), dtype=np.int64)
+            source = np.repeat(np.arange(len(self.names)), np.diff(self.indptr))
+            while True:
+                updated = labels.copy()
+                np.minimum.at(updated, source, labels[self.neighbours])
+                updated = updated[updated]
+                if np.array_equal(updated, labels):
+                    break
+                labels = updated
+            self._components = labels
+        return self._components
+    
+    def component_of(self, name):
+        # Pessoas no mesmo componente conexo de name
+        labels = self.connected_components()
+        return [self.names[node] for node in np.flatnonzero(labels == labels[self.node_of[name]])]
+    
+    def component_sizes(self):
+        # Tamanho de cada componente, do maior para o menor
+        return np.sort(np.bincount(self.connected_components()))[::-1]
 
 class NetflixRecommendationEngine:
     # Engine para criar recomendações baseadas na análise dos dados
     
-    def __init__(self, analysis_results, df):
+    def __init__(self, analysis_results, df, catalog=None, similarity=None, timeline=None):
         self.results = analysis_results
         self.df = df
+        # CatalogTimeline opcional para tendências por data de adição
+        self.timeline = timeline
+        # Rankings pré-calculados lidos por todos os métodos abaixo
+        self.cube = AggregateCube(analysis_results, catalog)
+        # SimilarTitlesEngine opcional para recomendações item-a-item
+        self.similarity = similarity
+        # Relatórios no stdout (desligados no serviço HTTP)
+        self.verbose = True
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def similar_titles(self, show_id, k=10):
+        # Títulos mais parecidos com show_id (gêneros, elenco, direção, país e descrição)
+        if self.similarity is None:
+            raise ValueError("Informe um SimilarTitlesEngine em similarity= para buscar títulos parecidos")
+        similar = self.similarity.similar(show_id, k)
+        self.log(f"\n🔗 Títulos parecidos com {show_id}:")
+        for i, (similar_id, title, score) in enumerate(similar, 1):
+            self.log(f"{i}. {title} ({similar_id}) - similaridade {score:.3f}")
+        return similar
+    
+    def duration_values(self, content_type, unit):
+        # Durações numéricas (unit='minutes' ou 'seasons') de um tipo de conteúdo;
+        # usa as colunas já separadas do CompactCatalog quando disponíveis
+        column = f'duration_{unit}'
+        if column not in self.df:
+            self.df = self.df.assign(**dict(zip(
+                ['duration_minutes', 'duration_seasons'], parse_durations(self.df['duration']))))
+        return self.df.loc[self.df['type'] == content_type, column].dropna()
         
-    def analyze_trends(self):
+    def analyze_trends(self, recent_from=2015):
         # Analisa tendências dos dados
-        print("\n🔍 ANÁLISE DE TENDÊNCIAS:")
+        # recent_from: primeiro ano de lançamento considerado em "anos mais produtivos"
+        self.log("\n🔍 ANÁLISE DE TENDÊNCIAS:")
         
         # Top gêneros
-        top_genres = sorted(self.results['genres'].items(), key=lambda x: x[1], reverse=True)[:10]
-        print(f"\n📈 Top 10 Gêneros mais populares:")
+        top_genres = self.cube.ranked('genres').top(10)
+        self.log(f"\n📈 Top 10 Gêneros mais populares:")
         for i, (genre, count) in enumerate(top_genres, 1):
-            print(f"{i}. {genre}: {count} títulos")
+            self.log(f"{i}. {genre}: {count} títulos")
         
         # Top países
-        top_countries = sorted(self.results['countries'].items(), key=lambda x: x[1], reverse=True)[:10]
-        print(f"\n🌍 Top 10 Países produtores:")
+        top_countries = self.cube.ranked('countries').top(10)
+        self.log(f"\n🌍 Top 10 Países produtores:")
         for i, (country, count) in enumerate(top_countries, 1):
-            print(f"{i}. {country}: {count} títulos")
+            self.log(f"{i}. {country}: {count} títulos")
         
         # Ratings mais comuns
-        top_ratings = sorted(self.results['ratings'].items(), key=lambda x: x[1], reverse=True)
-        print(f"\n⭐ Ratings mais comuns:")
+        top_ratings = self.cube.ranked('ratings').top()
+        self.log(f"\n⭐ Ratings mais comuns:")
         for rating, count in top_ratings:
-            print(f"{rating}: {count} títulos")
+            self.log(f"{rating}: {count} títulos")
         
         # Anos mais produtivos
-        recent_years = {year: count for year, count in self.results['years'].items() if year >= 2015}
-        top_recent_years = sorted(recent_years.items(), key=lambda x: x[1], reverse=True)[:5]
-        print(f"\n📅 Anos mais produtivos (2015+):")
+        # Filtrar a visão já ordenada equivale a ordenar o subconjunto (sort estável)
+        top_recent_years = [(year, count) for year, count in self.cube.ranked('years').top() if year >= recent_from][:5]
+        self.log(f"\n📅 Anos mais produtivos ({recent_from}+):")
         for year, count in top_recent_years:
-            print(f"{year}: {count} títulos")
+            self.log(f"{year}: {count} títulos")
         
         # Análise por tipo
-        print(f"\n🎭 Análise por tipo de conteúdo:")
+        self.log(f"\n🎭 Análise por tipo de conteúdo:")
         for content_type, data in self.results['type_analysis'].items():
-            print(f"\n{content_type.upper()}:")
-            print(f"  Total: {data['count']} títulos")
+            self.log(f"\n{content_type.upper()}:")
+            self.log(f"  Total: {data['count']} títulos")
             
-            top_genres_type = sorted(data['genres'].items(), key=lambda x: x[1], reverse=True)[:5]
-            print(f"  Top 5 gêneros:")
+            top_genres_type = self.cube.ranked('genres', content_type).top(5)
+            self.log(f"  Top 5 gêneros:")
             for genre, count in top_genres_type:
-                print(f"    {genre}: {count}")
+                self.log(f"    {genre}: {count}")
                 
-            top_countries_type = sorted(data['countries'].items(), key=lambda x: x[1], reverse=True)[:3]
-            print(f"  Top 3 países:")
+            top_countries_type = self.cube.ranked('countries', content_type).top(3)
+            self.log(f"  Top 3 países:")
             for country, count in top_countries_type:
-                print(f"    {country}: {count}")
+                self.log(f"    {country}: {count}")
         
         return {
             'top_genres': top_genres,
@@ -212,40 +2578,46 @@ class NetflixRecommendationEngine:
             'recent_years': top_recent_years
         }
     
+    def analyze_momentum(self, window=12, k=5, end=None):
+        # Momento do catálogo: títulos adicionados na última janela de `window`
+        # meses (terminada em end) contra a janela anterior, por gênero e país
+        if self.timeline is None:
+            raise ValueError("Informe um CatalogTimeline em timeline= para analisar o momento do catálogo")
+        stop = self.timeline.months - 1 if end is None else self.timeline.month(end)
+        self.log(f"\n🚀 MOMENTO DO CATÁLOGO (últimos {window} meses até {self.timeline.label(stop)}):")
+        
+        momentum = {}
+        for dimension, label in [('genre', 'Gêneros'), ('country', 'Países')]:
+            growth = self.timeline.growth(dimension, window, self.timeline.label(stop)).head(k)
+            self.log(f"\n📈 {label} que mais entraram no catálogo:")
+            for key, current, previous, rate in zip(growth.index, growth['current'], growth['previous'], growth['growth']):
+                change = f"{rate:+.0%}" if rate == rate else "novo"
+                self.log(f"  {key}: {current} títulos ({change} vs. {previous} na janela anterior)")
+            momentum[dimension] = growth
+        return momentum
+    
     def create_serie_recommendation(self, trends):
         # Cria recomendação de série baseada nas tendências
-        print("\n🎬 CRIANDO SÉRIE HIPOTÉTICA...")
-        
-        # Análise específica para TV Shows
-        tv_data = self.results['type_analysis']['TV Show']
+        self.log("\n🎬 CRIANDO SÉRIE HIPOTÉTICA...")
         
         # Gêneros mais populares para séries
-        top_tv_genres = sorted(tv_data['genres'].items(), key=lambda x: x[1], reverse=True)[:3]
+        top_tv_genres = self.cube.ranked('genres', 'TV Show').top(3)
         selected_genres = [genre for genre, _ in top_tv_genres]
         
         # País mais produtivo para séries (excluindo EUA para diversidade)
-        tv_countries = sorted(tv_data['countries'].items(), key=lambda x: x[1], reverse=True)
+        tv_countries = self.cube.ranked('countries', 'TV Show').top()
         selected_country = tv_countries[1][0] if tv_countries[1][0] != "United States" else tv_countries[2][0]
         
         # Rating mais comum para séries
-        top_tv_rating = sorted(tv_data['ratings'].items(), key=lambda x: x[1], reverse=True)[0][0]
+        top_tv_rating = self.cube.ranked('ratings', 'TV Show').top(1)[0][0]
         
         # Ano recente popular
-        recent_tv_years = {year: count for year, count in tv_data['years'].items() if year >= 2020}
-        selected_year = sorted(recent_tv_years.items(), key=lambda x: x[1], reverse=True)[0][0]
+        recent_tv_years = [year for year, _ in self.cube.ranked('years', 'TV Show').top() if year >= 2020]
+        selected_year = recent_tv_years[0]
         
         # Análise de duração típica para séries
-        tv_shows = self.df[self.df['type'] == 'TV Show']
-        seasons_data = []
-        for _, row in tv_shows.iterrows():
-            if not pd.isna(row['duration']) and 'Season' in str(row['duration']):
-                try:
-                    seasons = int(str(row['duration']).split()[0])
-                    seasons_data.append(seasons)
-                except:
-                    pass
-        
-        avg_seasons = round(sum(seasons_data) / len(seasons_data)) if seasons_data else 2
+        seasons_data = self.duration_values('TV Show', 'seasons')
+        avg_seasons = round(int(seasons_data.sum()) / len(seasons_data)) if len(seasons_data) else 2
         
         serie = {
             "show_id": "s_new_001",
@@ -262,49 +2634,36 @@ class NetflixRecommendationEngine:
             "description": f"Uma equipe de investigadores especializados em crimes digitais precisa desvendar uma rede de conspiração que ameaça o sistema financeiro global. Entre códigos, hackers e segredos corporativos, eles descobrem que a verdade pode estar mais próxima do que imaginavam."
         }
         
-        print(f"✨ SÉRIE CRIADA: '{serie['title']}'")
-        print(f"📍 País: {serie['country']}")
-        print(f"🎭 Gêneros: {serie['listed_in']}")
-        print(f"⭐ Rating: {serie['rating']}")
-        print(f"📅 Duração: {serie['duration']}")
-        print(f"📝 Descrição: {serie['description']}")
+        self.log(f"✨ SÉRIE CRIADA: '{serie['title']}'")
+        self.log(f"📍 País: {serie['country']}")
+        self.log(f"🎭 Gêneros: {serie['listed_in']}")
+        self.log(f"⭐ Rating: {serie['rating']}")
+        self.log(f"📅 Duração: {serie['duration']}")
+        self.log(f"📝 Descrição: {serie['description']}")
         
         return serie
     
     def create_movie_recommendation(self, trends):
         # Cria recomendação de filme baseada nas tendências
-        print("\n🎥 CRIANDO FILME HIPOTÉTICO...")
-        
-        # Análise específica para Movies
-        movie_data = self.results['type_analysis']['Movie']
+        self.log("\n🎥 CRIANDO FILME HIPOTÉTICO...")
         
         # Gêneros mais populares para filmes (excluindo os da série para diversidade)
-        movie_genres = sorted(movie_data['genres'].items(), key=lambda x: x[1], reverse=True)
+        movie_genres = self.cube.ranked('genres', 'Movie').top()
         selected_genres = []
         for genre, _ in movie_genres:
             if len(selected_genres) < 3 and 'TV' not in genre:
                 selected_genres.append(genre)
         
         # País diferente da série
-        movie_countries = sorted(movie_data['countries'].items(), key=lambda x: x[1], reverse=True)
         selected_country = "United States"  # Maior produtor de filmes
         
         # Rating adequado para filmes
-        movie_ratings = sorted(movie_data['ratings'].items(), key=lambda x: x[1], reverse=True)
+        movie_ratings = self.cube.ranked('ratings', 'Movie').top()
         selected_rating = movie_ratings[0][0] if movie_ratings[0][0] != 'TV-MA' else movie_ratings[1][0]
         
         # Duração típica para filmes
-        movies = self.df[self.df['type'] == 'Movie']
-        durations = []
-        for _, row in movies.iterrows():
-            if not pd.isna(row['duration']) and 'min' in str(row['duration']):
-                try:
-                    duration = int(str(row['duration']).split()[0])
-                    durations.append(duration)
-                except:
-                    pass
-        
-        avg_duration = round(sum(durations) / len(durations)) if durations else 95
+        durations = self.duration_values('Movie', 'minutes')
+        avg_duration = round(int(durations.sum()) / len(durations)) if len(durations) else 95
         
         movie = {
             "show_id": "s_new_002",
@@ -321,167 +2680,500 @@ class NetflixRecommendationEngine:
             "description": f"Uma brilhante cientista da computação descobre que sua criação, uma inteligência artificial avançada, desenvolveu sentimentos genuínos. Agora ela precisa decidir se deve proteger sua criação ou entregá-la para uma corporação que planeja usá-la para fins militares."
         }
         
-        print(f"✨ FILME CRIADO: '{movie['title']}'")
-        print(f"📍 País: {movie['country']}")
-        print(f"🎭 Gêneros: {movie['listed_in']}")
-        print(f"⭐ Rating: {movie['rating']}")
-        print(f"⏱️ Duração: {movie['duration']}")
-        print(f"📝 Descrição: {movie['description']}")
+        self.log(f"✨ FILME CRIADO: '{movie['title']}'")
+        self.log(f"📍 País: {movie['country']}")
+        self.log(f"🎭 Gêneros: {movie['listed_in']}")
+        self.log(f"⭐ Rating: {movie['rating']}")
+        self.log(f"⏱️ Duração: {movie['duration']}")
+        self.log(f"📝 Descrição: {movie['description']}")
         
         return movie
     
-    def justify_recommendations(self, serie, movie, trends):
-        # Justifica as escolhas baseadas na análise MapReduce
-        print("\n📋 JUSTIFICATIVAS DAS RECOMENDAÇÕES:")
-        print("=" * 50)
-        
-        print(f"\n🎬 JUSTIFICATIVA DA SÉRIE '{serie['title']}':")
-        print("-" * 40)
+    def _justify_item(self, item, content_type, label):
+        # Posição de cada escolha nos rankings do tipo (lookup O(1) no cubo)
         
-        tv_data = self.results['type_analysis']['TV Show']
-        
-        # Justificativa de gêneros
-        top_tv_genres = sorted(tv_data['genres'].items(), key=lambda x: x[1], reverse=True)[:5]
-        print(f"📊 Gêneros escolhidos baseados nos dados:")
-        for i, genre in enumerate(serie['listed_in'].split(', ')):
-            for j, (tv_genre, count) in enumerate(top_tv_genres):
-                if genre == tv_genre:
-                    print(f"  • {genre}: {j+1}º gênero mais popular em séries com {count} títulos")
-                    break
+        # Justificativa de gêneros (entre os 5 mais populares do tipo)
+        self.log(f"📊 Gêneros escolhidos baseados nos dados:")
+        for genre in item['listed_in'].split(', '):
+            rank = self.cube.ranked('genres', content_type).rank(genre)
+            if rank and rank[0] <= 5:
+                self.log(f"  • {genre}: {rank[0]}º gênero mais popular em {label} com {rank[1]} títulos")
         
         # Justificativa de país
-        tv_countries = sorted(tv_data['countries'].items(), key=lambda x: x[1], reverse=True)
-        for i, (country, count) in enumerate(tv_countries):
-            if country == serie['country']:
-                print(f"🌍 País escolhido: {country} - {i+1}º maior produtor de séries com {count} títulos")
-                break
+        rank = self.cube.ranked('countries', content_type).rank(item['country'])
+        if rank:
+            self.log(f"🌍 País escolhido: {item['country']} - {rank[0]}º maior produtor de {label} com {rank[1]} títulos")
         
         # Justificativa de rating
-        tv_ratings = sorted(tv_data['ratings'].items(), key=lambda x: x[1], reverse=True)
-        for i, (rating, count) in enumerate(tv_ratings):
-            if rating == serie['rating']:
-                print(f"⭐ Rating escolhido: {rating} - {i+1}º rating mais comum em séries com {count} títulos")
-                break
+        rank = self.cube.ranked('ratings', content_type).rank(item['rating'])
+        if rank:
+            self.log(f"⭐ Rating escolhido: {item['rating']} - {rank[0]}º rating mais comum em {label} com {rank[1]} títulos")
+    
+    def batch_recommendations(self, content_type, by=('country',), year_window=None, top_genres=3, min_titles=1):
+        # Gera perfis recomendados para todos os segmentos de uma vez (ex.: por
+        # país, por rating, por janela de anos), a partir das células
+        # pré-calculadas do cubo em vez de varrer o dataset a cada segmento.
+        # by: dimensões do segmento ('country', 'rating', 'year', 'year_window')
+        # year_window: tamanho da janela de anos (tumbling) para 'year_window'
+        started = time.perf_counter()
+        by = list(by)
+        cells = self.cube.cells()
+        titles = cells['titles'][cells['titles']['type'] == content_type]
+        genres = cells['genres'][cells['genres']['type'] == content_type]
+        if 'year_window' in by:
+            window = year_window or 5
+            titles = titles.assign(year_window=titles['year'] // window * window)
+            genres = genres.assign(year_window=genres['year'] // window * window)
         
-        print(f"\n🎥 JUSTIFICATIVA DO FILME '{movie['title']}':")
-        print("-" * 40)
+        # Tamanho e duração média de cada segmento
+        segments = titles.groupby(by, sort=False)[['count', 'duration_sum', 'duration_n']].sum()
+        segments = segments[segments['count'] >= min_titles]
         
-        movie_data = self.results['type_analysis']['Movie']
+        def top_values(table, field, k):
+            totals = table.groupby(by + [field], sort=False)['count'].sum().reset_index()
+            totals = totals.sort_values(by + ['count'], ascending=[True] * len(by) + [False], kind='stable')
+            return totals.groupby(by, sort=False).head(k).groupby(by, sort=False)[field].agg(list)
         
-        # Justificativa de gêneros
-        top_movie_genres = sorted(movie_data['genres'].items(), key=lambda x: x[1], reverse=True)[:5]
-        print(f"📊 Gêneros escolhidos baseados nos dados:")
-        for i, genre in enumerate(movie['listed_in'].split(', ')):
-            for j, (mv_genre, count) in enumerate(top_movie_genres):
-                if genre == mv_genre:
-                    print(f"  • {genre}: {j+1}º gênero mais popular em filmes com {count} títulos")
-                    break
+        profiles = segments.join(top_values(genres, 'genre', top_genres).rename('genres'))
+        for field in ['rating', 'country']:
+            if field not in by:
+                profiles = profiles.join(top_values(titles, field, 1).str[0].rename(field))
         
-        # Justificativa de país
-        movie_countries = sorted(movie_data['countries'].items(), key=lambda x: x[1], reverse=True)
-        for i, (country, count) in enumerate(movie_countries):
-            if country == movie['country']:
-                print(f"🌍 País escolhido: {country} - {i+1}º maior produtor de filmes com {count} títulos")
-                break
+        unit = 'min' if content_type == 'Movie' else 'Seasons'
+        average = (profiles['duration_sum'] / profiles['duration_n']).round()
+        profiles['duration'] = average.map(lambda value: f"{int(value)} {unit}" if value == value else None)
+        profiles['listed_in'] = profiles['genres'].map(
+            lambda values: ", ".join(values) if isinstance(values, list) else "")
+        profiles = profiles.rename(columns={'count': 'titles'}).drop(
+            columns=['duration_sum', 'duration_n', 'genres']).sort_values('titles', ascending=False).reset_index()
         
-        # Justificativa de rating
-        movie_ratings = sorted(movie_data['ratings'].items(), key=lambda x: x[1], reverse=True)
-        for i, (rating, count) in enumerate(movie_ratings):
-            if rating == movie['rating']:
-                print(f"⭐ Rating escolhido: {rating} - {i+1}º rating mais comum em filmes com {count} títulos")
-                break
+        elapsed = time.perf_counter() - started
+        self.log(f"⚡ {len(profiles)} segmentos de {content_type} em {elapsed:.3f}s "
+              f"({len(profiles) / max(elapsed, 1e-9):.0f} segmentos/s)")
+        return profiles
+    
+    def justify_recommendations(self, serie, movie, trends):
+        # Justifica as escolhas baseadas na análise MapReduce
+        self.log("\n📋 JUSTIFICATIVAS DAS RECOMENDAÇÕES:")
+        self.log("=" * 50)
+        
+        self.log(f"\n🎬 JUSTIFICATIVA DA SÉRIE '{serie['title']}':")
+        self.log("-" * 40)
+        self._justify_item(serie, 'TV Show', 'séries')
+        
+        self.log(f"\n🎥 JUSTIFICATIVA DO FILME '{movie['title']}':")
+        self.log("-" * 40)
+        self._justify_item(movie, 'Movie', 'filmes')
         
-        print(f"\n🧠 ESTRATÉGIA DE RECOMENDAÇÃO:")
-        print("-" * 40)
-        print("• Baseou-se nos gêneros mais populares identificados via MapReduce")
-        print("• Considerou países com maior produção de conteúdo")
-        print("• Utilizou ratings mais comuns para cada tipo de conteúdo")
-        print("• Analisou durações médias através de processamento distribuído")
-        print("• Criou diversidade entre série e filme para ampliar audiência")
-        print("• Focou em temas contemporâneos (tecnologia/IA) que estão em alta")
+        self.log(f"\n🧠 ESTRATÉGIA DE RECOMENDAÇÃO:")
+        self.log("-" * 40)
+        self.log("• Baseou-se nos gêneros mais populares identificados via MapReduce")
+        self.log("• Considerou países com maior produção de conteúdo")
+        self.log("• Utilizou ratings mais comuns para cada tipo de conteúdo")
+        self.log("• Analisou durações médias através de processamento distribuído")
+        self.log("• Criou diversidade entre série e filme para ampliar audiência")
+        self.log("• Focou em temas contemporâneos (tecnologia/IA) que estão em alta")
+
+# Versão do desenho dos gráficos; altere ao mudar qualquer _draw_* para
+# invalidar os PNGs já renderizados
+CHART_VERSION = '1'
+
+# Resolução dos gráficos finais e das prévias rápidas
+CHART_DPI = 300
+PREVIEW_DPI = 72
+
+def _apply_chart_style():
+    # Configurar fondo negro puro
+    plt.style.use('dark_background')
+    plt.rcParams['figure.facecolor'] = '#000000'
+    plt.rcParams['axes.facecolor'] = '#000000'
+    plt.rcParams['savefig.facecolor'] = '#000000'
+
+def _draw_dashboard(data):
+    # Painel principal: gêneros, países, ratings e anos (data já traz os tops)
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12), facecolor='#000000')
+    fig.patch.set_facecolor('#000000')
+    fig.suptitle('Análise Netflix - Resultados MapReduce', fontsize=16, fontweight='bold', color='white')
+    
+    # Configurar fondo negro para cada subplot
+    ax1.set_facecolor('#000000')
+    ax2.set_facecolor('#000000')
+    ax3.set_facecolor('#000000')
+    ax4.set_facecolor('#000000')
+    
+    # 1. Top 10 Gêneros
+    genres, counts = zip(*data['genres'])
+    
+    ax1.barh(range(len(genres)), counts, color='red', alpha=0.8)
+    ax1.set_yticks(range(len(genres)))
+    ax1.set_yticklabels([g[:20] + '...' if len(g) > 20 else g for g in genres], color='white')
+    ax1.set_xlabel('Número de Títulos', color='white')
+    ax1.set_title('Top 10 Gêneros Mais Populares', color='white')
+    ax1.tick_params(colors='white')
+    ax1.invert_yaxis()
+    
+    # 2. Top 5 Países
+    countries, country_counts = zip(*data['countries'])
+    
+    ax2.bar(range(len(countries)), country_counts, color='blue', alpha=0.8)
+    ax2.set_xticks(range(len(countries)))
+    ax2.set_xticklabels([c[:8] + '...' if len(c) > 8 else c for c in countries], rotation=45, color='white')
+    ax2.set_ylabel('Número de Títulos', color='white')
+    ax2.set_title('Top 5 Países Produtores', color='white')
+    ax2.tick_params(colors='white')
+    
+    # 3. Distribuição de Ratings
+    rating_names, rating_counts = zip(*data['ratings'])
+    
+    colors = plt.cm.Set3(np.linspace(0, 1, len(rating_names)))
+    wedges, texts, autotexts = ax3.pie(rating_counts, labels=rating_names, autopct='%1.1f%%', 
+                                      colors=colors, startangle=90)
+    ax3.set_title('Distribuição de Ratings', color='white')
+    # Configurar cores do texto para branco
+    for text in texts:
+        text.set_color('white')
+    for autotext in autotexts:
+        autotext.set_color('black')
+        autotext.set_fontweight('bold')
+    
+    # 4. Anos mais produtivos (últimas décadas)
+    years, year_counts = zip(*data['years'])
+    
+    ax4.plot(years, year_counts, marker='o', linewidth=2, markersize=8, color='lime')
+    ax4.set_xlabel('Ano', color='white')
+    ax4.set_ylabel('Número de Títulos', color='white')
+    ax4.set_title('Produção por Ano (2010+)', color='white')
+    ax4.tick_params(colors='white')
+    ax4.grid(True, alpha=0.3, color='gray')
+    return fig
+
+def _draw_bar(data):
+    # Barras horizontais de um ranking: data = {'title', 'items': [[rótulo, contagem], ...], 'color'}
+    labels, counts = zip(*data['items'])
+    fig, ax = plt.subplots(figsize=(8, 0.45 * len(labels) + 1.5), facecolor='#000000')
+    ax.barh(range(len(labels)), counts, color=data.get('color', 'red'), alpha=0.8)
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels([str(label)[:25] + '...' if len(str(label)) > 25 else str(label) for label in labels],
+                       color='white')
+    ax.set_xlabel('Número de Títulos', color='white')
+    ax.set_title(data['title'], color='white')
+    ax.tick_params(colors='white')
+    ax.invert_yaxis()
+    return fig
+
+def _draw_line(data):
+    # Série temporal: data = {'title', 'points': [[ano, contagem], ...], 'color'}
+    years, counts = zip(*data['points'])
+    fig, ax = plt.subplots(figsize=(10, 5), facecolor='#000000')
+    ax.plot(years, counts, marker='o', linewidth=2, markersize=4, color=data.get('color', 'lime'))
+    ax.set_xlabel('Ano', color='white')
+    ax.set_ylabel('Número de Títulos', color='white')
+    ax.set_title(data['title'], color='white')
+    ax.tick_params(colors='white')
+    ax.grid(True, alpha=0.3, color='gray')
+    return fig
+
+CHART_KINDS = {
+    'dashboard': _draw_dashboard,
+    'bar': _draw_bar,
+    'line': _draw_line,
+}
+
+def _render_chart(path, kind, data, dpi):
+    # Tarefa de renderização: desenha um gráfico e grava o PNG (roda em um processo do pool)
+    _apply_chart_style()
+    fig = CHART_KINDS[kind](data)
+    plt.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight', facecolor='#000000', edgecolor='none', pad_inches=0)
+    plt.close(fig)
+    return path
+
+class ChartRenderer:
+    # Renderiza vários gráficos em paralelo (um processo por gráfico pendente).
+    # Cada PNG fica associado ao hash dos agregados que o originaram; se os
+    # dados, o tipo e a resolução não mudaram e o arquivo existe, ele é pulado
+    
+    def __init__(self, workers=None, preview=False, cache_dir='.netflix_cache'):
+        # preview=True renderiza em PREVIEW_DPI (rápido) em vez de CHART_DPI, em
+        # arquivos '*.preview.png' que não sobrescrevem os gráficos completos
+        # cache_dir=None desliga o cache (sempre renderiza, ex.: no benchmark);
+        # o diretório só é criado ao gravar o manifesto
+        self.workers = workers or os.cpu_count() or 1
+        self.preview = preview
+        self.dpi = PREVIEW_DPI if preview else CHART_DPI
+        self.manifest_path = os.path.join(cache_dir, 'charts.json') if cache_dir else None
+    
+    def output_path(self, path):
+        # Caminho efetivamente gravado para um gráfico ('x.png' -> 'x.preview.png' na prévia)
+        if not self.preview:
+            return path
+        root, extension = os.path.splitext(path)
+        return f"{root}.preview{extension}"
+    
+    def fingerprint(self, kind, data):
+        payload = json.dumps([CHART_VERSION, kind, self.dpi, data], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _load_manifest(self):
+        if self.manifest_path is None:
+            return {}
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self, manifest):
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def render(self, charts):
+        # charts: lista de (caminho do PNG, tipo em CHART_KINDS, dados serializáveis em JSON)
+        # Retorna {caminho gravado (output_path): 'rendered' | 'cached'}
+        manifest = self._load_manifest()
+        status = {}
+        pending = []
+        for path, kind, data in charts:
+            path = self.output_path(path)
+            digest = self.fingerprint(kind, data)
+            if manifest.get(os.path.abspath(path)) == digest and os.path.exists(path):
+                status[path] = 'cached'
+            else:
+                pending.append((path, kind, data, digest))
+        
+        if len(pending) == 1 or self.workers == 1:
+            # Sem ganho em abrir processos para um único gráfico
+            for path, kind, data, _ in pending:
+                _render_chart(path, kind, data, self.dpi)
+        elif pending:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+                futures = [pool.submit(_render_chart, path, kind, data, self.dpi) for path, kind, data, _ in pending]
+                for future in futures:
+                    future.result()
+        
+        for path, _, _, digest in pending:
+            status[path] = 'rendered'
+            manifest[os.path.abspath(path)] = digest
+        if pending and self.manifest_path:
+            self._save_manifest(manifest)
+        return status
 
 class NetflixVisualization:
     # Classe para gerar todas as visualizações em PNG
     
-    def __init__(self, results, df):
+    def __init__(self, results, df, renderer=None):
         self.results = results
         self.df = df
+        self.renderer = renderer or ChartRenderer()
+    
+    @staticmethod
+    def _top(counts, k):
+        return [[key, count] for key, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)[:k]]
+    
+    def main_chart_data(self):
+        # Agregados exibidos no painel principal (também são a chave do cache)
+        recent_years = {year: count for year, count in self.results['years'].items() if year >= 2010}
+        return {
+            'genres': self._top(self.results['genres'], 10),
+            'countries': self._top(self.results['countries'], 5),
+            'ratings': self._top(self.results['ratings'], 8),
+            'years': self._top(recent_years, 8),
+        }
     
     def generate_main_charts(self):
         # Gera gráficos principais e salva em PNG
         print("\n📊 GERANDO VISUALIZAÇÕES PRINCIPAIS...")
+        status = self.renderer.render([('analise_netflix_mapreduce.png', 'dashboard', self.main_chart_data())])
+        path = self.renderer.output_path('analise_netflix_mapreduce.png')
+        if status[path] == 'cached':
+            print(f"   ♻️ Gráficos principais inalterados, mantido '{path}'")
+        else:
+            print(f"   📈 Gráficos principais salvos em '{path}'")
+    
+    def segment_charts(self, output_dir, cube=None, top_countries=5, recent_years=5, k=10):
+        # Especificações dos gráficos por tipo (gêneros, países, anos) e, com um
+        # AggregateCube com catálogo, por país e por ano recente
+        def slug(value):
+            return re.sub(r'[^0-9A-Za-z]+', '_', str(value)).strip('_').lower()
         
-        # Configurar fondo negro puro
-        plt.style.use('dark_background')
-        plt.rcParams['figure.facecolor'] = '#000000'
-        plt.rcParams['axes.facecolor'] = '#000000'
-        plt.rcParams['savefig.facecolor'] = '#000000'
-        
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12), facecolor='#000000')
-        fig.patch.set_facecolor('#000000')
-        fig.suptitle('Análise Netflix - Resultados MapReduce', fontsize=16, fontweight='bold', color='white')
-        
-        # Configurar fondo negro para cada subplot
-        ax1.set_facecolor('#000000')
-        ax2.set_facecolor('#000000')
-        ax3.set_facecolor('#000000')
-        ax4.set_facecolor('#000000')
-        
-        # 1. Top 10 Gêneros
-        top_genres = sorted(self.results['genres'].items(), key=lambda x: x[1], reverse=True)[:10]
-        genres, counts = zip(*top_genres)
-        
-        bars1 = ax1.barh(range(len(genres)), counts, color='red', alpha=0.8)
-        ax1.set_yticks(range(len(genres)))
-        ax1.set_yticklabels([g[:20] + '...' if len(g) > 20 else g for g in genres], color='white')
-        ax1.set_xlabel('Número de Títulos', color='white')
-        ax1.set_title('Top 10 Gêneros Mais Populares', color='white')
-        ax1.tick_params(colors='white')
-        ax1.invert_yaxis()
-        
-        # 2. Top 5 Países
-        top_countries = sorted(self.results['countries'].items(), key=lambda x: x[1], reverse=True)[:5]
-        countries, country_counts = zip(*top_countries)
-        
-        bars2 = ax2.bar(range(len(countries)), country_counts, color='blue', alpha=0.8)
-        ax2.set_xticks(range(len(countries)))
-        ax2.set_xticklabels([c[:8] + '...' if len(c) > 8 else c for c in countries], rotation=45, color='white')
-        ax2.set_ylabel('Número de Títulos', color='white')
-        ax2.set_title('Top 5 Países Produtores', color='white')
-        ax2.tick_params(colors='white')
-        
-        # 3. Distribuição de Ratings
-        top_ratings = sorted(self.results['ratings'].items(), key=lambda x: x[1], reverse=True)[:8]
-        rating_names, rating_counts = zip(*top_ratings)
-        
-        colors = plt.cm.Set3(np.linspace(0, 1, len(rating_names)))
-        wedges, texts, autotexts = ax3.pie(rating_counts, labels=rating_names, autopct='%1.1f%%', 
-                                          colors=colors, startangle=90)
-        ax3.set_title('Distribuição de Ratings', color='white')
-        # Configurar cores do texto para branco
-        for text in texts:
-            text.set_color('white')
-        for autotext in autotexts:
-            autotext.set_color('black')
-            autotext.set_fontweight('bold')
-        
-        # 4. Anos mais produtivos (últimas décadas)
-        recent_years = {year: count for year, count in self.results['years'].items() if year >= 2010}
-        top_years = sorted(recent_years.items(), key=lambda x: x[1], reverse=True)[:8]
-        years, year_counts = zip(*top_years)
-        
-        ax4.plot(years, year_counts, marker='o', linewidth=2, markersize=8, color='lime')
-        ax4.set_xlabel('Ano', color='white')
-        ax4.set_ylabel('Número de Títulos', color='white')
-        ax4.set_title('Produção por Ano (2010+)', color='white')
-        ax4.tick_params(colors='white')
-        ax4.grid(True, alpha=0.3, color='gray')
-        
-        plt.tight_layout()
-        plt.savefig('analise_netflix_mapreduce.png', dpi=300, bbox_inches='tight', 
-                   facecolor='#000000', edgecolor='none', pad_inches=0)
-        plt.close()
-        print("   📈 Gráficos principais salvos em 'analise_netflix_mapreduce.png'")
+        charts = []
+        for content_type, analysis in self.results['type_analysis'].items():
+            name = slug(content_type)
+            charts.append((os.path.join(output_dir, f'tipo_{name}_generos.png'), 'bar', {
+                'title': f'Top {k} Gêneros - {content_type}', 'items': self._top(analysis['genres'], k)}))
+            charts.append((os.path.join(output_dir, f'tipo_{name}_paises.png'), 'bar', {
+                'title': f'Top {k} Países - {content_type}', 'items': self._top(analysis['countries'], k),
+                'color': 'blue'}))
+            years = sorted((year, count) for year, count in analysis['years'].items() if year > 0)
+            charts.append((os.path.join(output_dir, f'tipo_{name}_anos.png'), 'line', {
+                'title': f'Produção por Ano - {content_type}', 'points': [list(point) for point in years]}))
+        
+        if cube is not None and cube.catalog is not None:
+            for country, _ in self._top(self.results['countries'], top_countries):
+                genres = cube.ranked_segment('genre', country=country).top(k)
+                charts.append((os.path.join(output_dir, f'pais_{slug(country)}_generos.png'), 'bar', {
+                    'title': f'Top {k} Gêneros - {country}', 'items': [list(item) for item in genres]}))
+            for year in sorted(self.results['years'], reverse=True)[:recent_years]:
+                genres = cube.ranked_segment('genre', year=year).top(k)
+                charts.append((os.path.join(output_dir, f'ano_{year}_generos.png'), 'bar', {
+                    'title': f'Top {k} Gêneros - {year}', 'items': [list(item) for item in genres],
+                    'color': 'orange'}))
+        return charts
+    
+    def generate_segment_charts(self, output_dir='graficos', cube=None, **kwargs):
+        # Renderiza os gráficos por segmento em paralelo, pulando os inalterados
+        print(f"\n📊 GERANDO GRÁFICOS POR SEGMENTO EM '{output_dir}/'...")
+        os.makedirs(output_dir, exist_ok=True)
+        status = self.renderer.render(self.segment_charts(output_dir, cube, **kwargs))
+        rendered = sum(1 for state in status.values() if state == 'rendered')
+        print(f"   📈 {rendered} gráficos renderizados, {len(status) - rendered} inalterados (cache)")
+        return status
+
+def stable_partition(key, partitions):
+    # Particionador do shuffle: hash() de str muda a cada processo,
+    # então usamos crc32 para que todos os mappers concordem
+    return zlib.crc32(repr(key).encode('utf-8')) % partitions
+
+def find_csv_splits(csv_file, num_splits, block_size=1 << 20):
+    # Divide o CSV em faixas de bytes alinhadas ao fim de um registro.
+    # Campos entre aspas podem conter quebras de linha, então uma
+    # fronteira só é aceita quando o número de aspas até ela é par.
+    size = os.path.getsize(csv_file)
+    with open(csv_file, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        targets = [data_start + (size - data_start) * i // num_splits for i in range(1, num_splits)]
+        boundaries = [data_start]
+        in_quotes = False
+        block_start = data_start
+        
+        while targets:
+            block = f.read(block_size)
+            if not block:
+                break
+            pos = 0
+            while targets and pos < len(block):
+                target = max(targets[0] - block_start, pos)
+                if target >= len(block):
+                    break
+                in_quotes ^= block.count(b'"', pos, target) % 2 == 1
+                pos = target
+                newline = block.find(b'\n', pos)
+                if newline == -1:
+                    break
+                in_quotes ^= block.count(b'"', pos, newline) % 2 == 1
+                pos = newline + 1
+                if not in_quotes:
+                    boundary = block_start + pos
+                    boundaries.append(boundary)
+                    while targets and targets[0] <= boundary:
+                        targets.pop(0)
+            in_quotes ^= block.count(b'"', pos) % 2 == 1
+            block_start += len(block)
+    
+    boundaries.append(size)
+    splits = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+    return header, splits
+
+def read_csv_split(csv_file, header, start, end):
+    # Lê uma faixa de bytes do CSV como um DataFrame independente
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        chunk = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + chunk))
+
+def _run_map_task(csv_file, header, start, end, job_names, partitions):
+    # Tarefa MAP: processa um split, combina localmente e particiona os
+    # parciais por reducer. Só chaves distintas do split atravessam o shuffle
+    analyzer = NetflixMapReduce(read_csv_split(csv_file, header, start, end), job_names=job_names)
+    analyzer.verbose = False
+    partials, pairs = analyzer.combine(analyzer.iter_records(analyzer.required_columns()))
+    
+    buckets = {name: [{} for _ in range(partitions)] for name in job_names}
+    for name, partial in partials.items():
+        for key, value in partial.items():
+            buckets[name][stable_partition(key, partitions)][key] = value
+    
+    # A ordem das chaves de cada parcial é a de primeira ocorrência no split
+    return buckets, {name: list(partial) for name, partial in partials.items()}, len(analyzer.df), pairs
+
+def _run_sketch_task(csv_file, header, start, end, job_names):
+    # Tarefa MAP aproximada: sketches de um split (mesclados pelo processo principal)
+    analyzer = NetflixMapReduce(read_csv_split(csv_file, header, start, end), job_names=job_names)
+    analyzer.verbose = False
+    return analyzer.sketch([analyzer.df])
+
+def _run_reduce_task(partials):
+    # Tarefa REDUCE: soma os parciais combinados de uma partição, na ordem dos splits
+    reduced = {}
+    for partial in partials:
+        merge_results(reduced, partial)
+    return reduced
+
+class LocalMapReduceExecutor:
+    # Executor MapReduce local: splits reais do CSV, mappers em processos,
+    # shuffle particionado por hash e reducers executados em paralelo
+    
+    def __init__(self, csv_file, workers=None, reducers=None, splits=None, job_names=None, profiler=None):
+        self.csv_file = csv_file
+        self.profiler = profiler or NULL_PROFILER
+        self.workers = workers or os.cpu_count() or 1
+        self.reducers = reducers or self.workers
+        self.num_splits = splits or self.workers
+        self.job_names = job_names or NetflixMapReduce.DEFAULT_JOBS
+        self.rows = 0
+        self.verbose = True
+    
+    def run(self):
+        header, splits = find_csv_splits(self.csv_file, self.num_splits)
+        if self.verbose:
+            print(f"   ⚙️ {len(splits)} splits, {self.workers} workers, {self.reducers} reducers")
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # MAP: um processo por split
+            with self.profiler.stage('parallel/map') as stage:
+                map_futures = [
+                    pool.submit(_run_map_task, self.csv_file, header, start, end, self.job_names, self.reducers)
+                    for start, end in splits
+                ]
+                map_outputs = [future.result() for future in map_futures]
+                self.rows = sum(rows for _, _, rows, _ in map_outputs)
+                stage.records_in = self.rows
+                stage.pairs = sum(pairs for _, _, _, pairs in map_outputs)
+                stage.records_out = sum(len(keys) for _, first_seen, _, _ in map_outputs for keys in first_seen.values())
+            
+            # SHUFFLE: junta a partição i de todos os mappers, na ordem dos splits.
+            # A etapa mede o agrupamento das partições e o envio aos reducers; a
+            # transferência dos dados entre processos (pickle) entra no tempo de
+            # parallel/map (saída dos mappers) e parallel/reduce (entrada dos reducers)
+            reduce_futures = {}
+            with self.profiler.stage('parallel/partition') as stage:
+                stage.records_in = 0
+                for name in self.job_names:
+                    for partition in range(self.reducers):
+                        partials = [buckets[name][partition] for buckets, _, _, _ in map_outputs
+                                    if buckets[name][partition]]
+                        stage.records_in += sum(len(partial) for partial in partials)
+                        if partials:
+                            reduce_futures[(name, partition)] = pool.submit(_run_reduce_task, partials)
+                stage.records_out = len(reduce_futures)
+            
+            # REDUCE: cada partição tem um conjunto disjunto de chaves
+            merged = {name: {} for name in self.job_names}
+            with self.profiler.stage('parallel/reduce', records_in=len(reduce_futures)) as stage:
+                for (name, _), future in reduce_futures.items():
+                    merged[name].update(future.result())
+                stage.records_out = sum(len(keys) for keys in merged.values())
+        
+        # Restaura a ordem de primeira ocorrência das chaves, como na execução serial
+        results = {}
+        for name in self.job_names:
+            order = dict.fromkeys(key for _, first_seen, _, _ in map_outputs for key in first_seen[name])
+            results[name] = {key: merged[name][key] for key in order}
+        return results
 
 def simulate_hadoop_mapreduce():
     # Simulação conceitual do Hadoop MapReduce
@@ -508,46 +3200,493 @@ def simulate_hadoop_mapreduce():
     print("✅ Dados processados distribuídamente (simulado)")
     print("✅ Tolerância a falhas implementada (conceitual)")
 
-def main():
+def _json_default(value):
+    # Tipos NumPy (contagens, anos) nas respostas JSON do serviço
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+class NetflixAnalysisService:
+    # Serviço de longa duração: carrega o catálogo uma vez e mantém resultados,
+    # cubo, índices invertidos e recomendações em memória, respondendo consultas
+    # por uma API HTTP assíncrona (asyncio). Quando o CSV muda, um novo estado é
+    # montado em segundo plano e trocado de uma vez, sem interromper as consultas
+    
+    # Campo do resultado global -> dimensão equivalente do AggregateCube
+    SEGMENT_FIELDS = {'genres': 'genre', 'countries': 'country', 'ratings': 'rating', 'years': 'year'}
+    SEGMENT_FILTERS = ['type', 'genre', 'country', 'rating', 'year', 'year_from', 'year_to']
+    INT_PARAMS = {'k', 'limit', 'year', 'year_from', 'year_to', 'top_genres', 'min_titles', 'year_window'}
+    # Contagens e tamanhos não podem ser negativos (year_window precisa ser >= 1)
+    MIN_VALUES = {'k': 0, 'limit': 0, 'top_genres': 0, 'min_titles': 0, 'year_window': 1}
+    # Rotas com trabalho pandas, executadas em thread para não bloquear o event loop
+    EXECUTOR_ROUTES = {'/top', '/recommendations', '/query'}
+    
+    def __init__(self, source='netflix_titles.csv', mode='vectorized', host='127.0.0.1', port=8765,
+                 poll_interval=5.0, use_cache=True):
+        # poll_interval: segundos entre verificações de alteração do CSV
+        self.source = source
+        self.mode = mode
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.cache = ResultCache() if use_cache else None
+        self.state = None
+        self.signature = None
+        self.reloads = 0
+        self.requests = 0
+        self.routes = {
+            '/health': self.handle_health,
+            '/trends': self.handle_trends,
+            '/top': self.handle_top,
+            '/recommendations': self.handle_recommendations,
+            '/query': self.handle_query,
+        }
+    
+    def _signature(self):
+        stat = os.stat(self.source)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _fingerprint(self):
+        # Conteúdo do CSV; snapshots (diretórios) são identificados pelo mtime/tamanho
+        return file_fingerprint(self.source) if os.path.isfile(self.source) else repr(self._signature())
+    
+    def build_state(self):
+        # Monta um estado completo fora do event loop. Tendências, série e filme
+        # são calculados aqui uma única vez; analisador e recomendador ficam com
+        # verbose=False, então nada é escrito no stdout (redirect_stdout não serve:
+        # é global ao processo e engoliria o log do event loop durante um reload)
+        fingerprint = self._fingerprint()
+        analyzer = NetflixMapReduce(self.source, cache=self.cache)
+        analyzer.verbose = False
+        results = analyzer.run_analysis(mode=self.mode)
+        catalog = analyzer.catalog()
+        recommender = NetflixRecommendationEngine(results, analyzer.load_columns(['type', 'duration']),
+                                                  catalog=catalog)
+        recommender.verbose = False
+        trends = recommender.analyze_trends()
+        serie = recommender.create_serie_recommendation(trends)
+        movie = recommender.create_movie_recommendation(trends)
+        return {
+            'fingerprint': fingerprint,
+            'loaded_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': analyzer.row_count,
+            'results': results,
+            'recommender': recommender,
+            'index': CatalogIndex(catalog),
+            'trends': trends,
+            'serie': serie,
+            'movie': movie,
+        }
+    
+    # ------------------------------------------------------------------
+    # Endpoints: recebem o estado corrente e os parâmetros da query string
+    # ------------------------------------------------------------------
+    
+    def handle_health(self, state, params):
+        return {
+            'status': 'ok',
+            'source': self.source,
+            'mode': self.mode,
+            'rows': state['rows'],
+            'fingerprint': state['fingerprint'],
+            'loaded_at': state['loaded_at'],
+            'reloads': self.reloads,
+            'requests': self.requests,
+        }
+    
+    def handle_trends(self, state, params):
+        by_type = {content_type: data['count'] for content_type, data in state['results']['type_analysis'].items()}
+        return dict(state['trends'], titles_by_type=by_type)
+    
+    def handle_top(self, state, params):
+        # /top?field=genres&k=10[&type=Movie][&country=India&year_from=2018...]
+        field = params.get('field', 'genres')
+        k = params.get('k', 10)
+        cube = state['recommender'].cube
+        filters = {name: params[name] for name in self.SEGMENT_FILTERS if name in params}
+        if set(filters) <= {'type'}:
+            view = cube.ranked(field, filters.get('type'))
+        else:
+            view = cube.ranked_segment(self.SEGMENT_FIELDS.get(field, field), **filters)
+        return {'field': field, 'filters': filters, 'items': view.top(k)}
+    
+    def handle_recommendations(self, state, params):
+        # Sem parâmetros: série e filme do pipeline principal.
+        # /recommendations?type=Movie&by=country,rating: perfis por segmento
+        if 'type' not in params:
+            return {'serie': state['serie'], 'movie': state['movie']}
+        by = params.get('by', 'country')
+        profiles = state['recommender'].batch_recommendations(
+            params['type'], by=by.split(',') if isinstance(by, str) else by,
+            year_window=params.get('year_window'), top_genres=params.get('top_genres', 3),
+            min_titles=params.get('min_titles', 1))
+        profiles = profiles.head(params.get('limit', 50))
+        return {'segments': profiles.astype(object).where(profiles.notna(), None).to_dict('records')}
+    
+    def handle_query(self, state, params):
+        # /query?genre=Dramas&genre=Comedies&country=Brazil&year_from=2015&limit=20
+        index = state['index']
+        filters = {name: params[name] for name in self.SEGMENT_FILTERS if name in params}
+        rows = index.query(**filters)
+        titles = index.titles(rows[:params.get('limit', 20)])
+        return {'count': len(rows), 'titles': titles.astype(object).where(titles.notna(), None).to_dict('records')}
+    
+    # ------------------------------------------------------------------
+    # HTTP sobre asyncio.start_server (HTTP/1.1 com keep-alive, só GET)
+    # ------------------------------------------------------------------
+    
+    def _params(self, query):
+        # Parâmetros repetidos viram listas (união nos filtros); numéricos viram int
+        params = {}
+        for name, values in parse_qs(query).items():
+            if name in self.INT_PARAMS:
+                values = [int(value) for value in values]
+                if name in self.MIN_VALUES and min(values) < self.MIN_VALUES[name]:
+                    raise ValueError(f"{name} deve ser >= {self.MIN_VALUES[name]}")
+            params[name] = values[0] if len(values) == 1 else values
+        return params
+    
+    async def dispatch(self, method, target):
+        # Resolve uma requisição em (status HTTP, payload JSON)
+        url = urlsplit(target)
+        handler = self.routes.get(url.path)
+        if handler is None:
+            return 404, {'error': f"Rota desconhecida: {url.path}", 'routes': list(self.routes)}
+        if method != 'GET':
+            return 405, {'error': f"Método não suportado: {method}"}
+        state = self.state
+        if state is None:
+            return 503, {'error': "Catálogo ainda carregando"}
+        self.requests += 1
+        try:
+            params = self._params(url.query)
+            if url.path in self.EXECUTOR_ROUTES:
+                payload = await asyncio.get_running_loop().run_in_executor(None, handler, state, params)
+            else:
+                payload = handler(state, params)
+            return 200, payload
+        except (KeyError, ValueError, TypeError) as error:
+            return 400, {'error': f"Parâmetro inválido: {error}"}
+    
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # Sem um Content-Length válido não há como achar a próxima requisição
+                    length = None
+                if length:
+                    await reader.readexactly(length)
+                
+                parts = request_line.decode('latin-1').split()
+                if length is None:
+                    status, payload, version = 400, {'error': "Content-Length inválido"}, 'HTTP/1.0'
+                elif len(parts) != 3:
+                    status, payload, version = 400, {'error': "Requisição malformada"}, 'HTTP/1.0'
+                else:
+                    method, target, version = parts
+                    status, payload = await self.dispatch(method, target)
+                
+                body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                        f"Content-Type: application/json; charset=utf-8\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def watch(self):
+        # Hot reload: verifica mtime/tamanho a cada poll_interval e, se o conteúdo
+        # mudou de fato, monta o novo estado em uma thread e troca a referência.
+        # Em caso de erro (ex.: CSV pela metade), o estado anterior continua servindo
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                signature = self._signature()
+            except OSError:
+                continue
+            if signature == self.signature:
+                continue
+            self.signature = signature
+            fingerprint = await loop.run_in_executor(None, self._fingerprint)
+            if fingerprint == self.state['fingerprint']:
+                continue
+            print(f"🔄 '{self.source}' alterado, recarregando catálogo...")
+            try:
+                state = await loop.run_in_executor(None, self.build_state)
+            except Exception as error:
+                print(f"❌ Falha ao recarregar, mantendo o estado anterior: {error}")
+                continue
+            self.state = state
+            self.reloads += 1
+            print(f"✅ Catálogo recarregado: {state['rows']} registros")
+    
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        print(f"📁 Carregando '{self.source}' (modo {self.mode})...")
+        self.signature = self._signature()
+        self.state = await loop.run_in_executor(None, self.build_state)
+        print(f"   Catálogo em memória: {self.state['rows']} registros")
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"🌐 Serviço disponível em http://{self.host}:{self.port} "
+              f"(rotas: {', '.join(self.routes)})")
+        watcher = asyncio.create_task(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+    
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\n👋 Serviço encerrado")
+
+# Etapas selecionáveis pela CLI e os jobs MapReduce de que cada uma depende
+DEFAULT_RECOMMENDATIONS = ['trends', 'serie', 'movie', 'justify']
+RECOMMENDATION_STAGES = DEFAULT_RECOMMENDATIONS + ['momentum']
+CHART_STAGES = ['main', 'segments']
+STAGE_JOBS = {
+    'trends': ['genres', 'countries', 'ratings', 'years', 'type_analysis'],
+    'serie': ['type_analysis'],
+    'movie': ['type_analysis'],
+    'justify': ['type_analysis'],
+    'momentum': [],
+    'main': ['genres', 'countries', 'ratings', 'years'],
+    'segments': ['type_analysis', 'countries', 'years'],
+}
+
+def resolve_jobs(analyses, stages):
+    # Jobs a executar: os pedidos (padrão DEFAULT_JOBS) mais os exigidos pelas
+    # recomendações e gráficos escolhidos, na ordem do registro de jobs
+    order = NetflixMapReduce.DEFAULT_JOBS + NetflixMapReduce.OPTIONAL_JOBS
+    required = set(NetflixMapReduce.DEFAULT_JOBS if analyses is None else analyses)
+    for stage in stages:
+        required.update(STAGE_JOBS[stage])
+    unknown = required - set(order)
+    if unknown:
+        raise ValueError(f"Análises desconhecidas: {', '.join(sorted(unknown))}")
+    return [name for name in order if name in required]
+
+def top_genres(source='netflix_titles.csv', k=10):
+    # Consulta rápida dos gêneros mais populares: lê só a coluna listed_in
+    # (do CSV ou do snapshot) e conta de forma vetorizada, sem o pipeline completo
+    analyzer = NetflixMapReduce(source, streaming=True, job_names=['genres'])
+    analyzer.verbose = False
+    analyzer.df = analyzer.load_columns(['listed_in'])
+    top = RankedView(analyzer.compute('vectorized')['genres']).top(k)
+    print(f"📈 Top {k} Gêneros mais populares:")
+    for i, (genre, count) in enumerate(top, 1):
+        print(f"{i}. {genre}: {count} títulos")
+    return top
+
+def main(execution_mode='classic', workers=None, streaming=False, chunksize=10000, use_cache=True,
+         source='netflix_titles.csv', profile_path=None, cprofile_path=None, trace_memory=False,
+         preview_charts=False, analyses=None, recommendations=DEFAULT_RECOMMENDATIONS, charts=('main',),
+         memory_budget=256 << 20):
     # Função principal unificada
+    # execution_mode: 'classic' (uma passada por job), 'fused' (passada única),
+    # 'vectorized' (engine colunar), 'parallel' (multiprocesso, usa workers) ou
+    # 'external' (shuffle em disco limitado a memory_budget bytes) ou
+    # 'approximate' (sketches com limites de erro; usa workers se informado)
+    # streaming: lê o CSV em chunks em vez de carregá-lo inteiro
+    # use_cache: reaproveita DataFrame e resultados de execuções anteriores
+    # source: CSV ou diretório de snapshot colunar (CatalogSnapshot)
+    # profile_path / cprofile_path: grava o perfil das etapas (JSON) / dump do cProfile
+    # trace_memory: mede o pico de alocações por etapa com tracemalloc (mais lento)
+    # preview_charts: renderiza os gráficos em resolução de prévia (PREVIEW_DPI)
+    # analyses: jobs MapReduce a executar (padrão DEFAULT_JOBS); os exigidos
+    # pelas recomendações/gráficos escolhidos são incluídos automaticamente
+    # recommendations: etapas de RECOMMENDATION_STAGES; charts: de CHART_STAGES
+    # ('segments' gera os gráficos por tipo, país e ano em graficos/)
+    recommendations = list(recommendations)
+    if 'justify' in recommendations:
+        recommendations += [stage for stage in ['serie', 'movie'] if stage not in recommendations]
+    charts = list(charts)
+    job_names = resolve_jobs(analyses, recommendations + charts)
+    
+    profiler = StageProfiler(trace_memory=trace_memory, cprofile_path=cprofile_path) \
+        if profile_path or cprofile_path else NULL_PROFILER
+    profiler.start()
+    
     print("🎯 ANÁLISE NETFLIX COM MAPREDUCE - VERSÃO UNIFICADA")
     print("=" * 60)
     
     # Inicializar análise MapReduce
     print(f"\n📁 Carregando dataset...")
-    analyzer = NetflixMapReduce('netflix_titles.csv')
-    print(f"   Dataset carregado: {len(analyzer.df)} registros")
+    cache = ResultCache() if use_cache else None
+    analyzer = NetflixMapReduce(source, streaming=streaming, chunksize=chunksize, cache=cache,
+                                job_names=job_names, profiler=profiler, memory_budget=memory_budget)
+    if analyzer.df is not None:
+        print(f"   Dataset carregado: {len(analyzer.df)} registros")
     
     # Executar análises
-    results = analyzer.run_analysis()
-    
-    # Inicializar engine de recomendações
-    recommender = NetflixRecommendationEngine(results, analyzer.df)
-    
-    # Analisar tendências
-    trends = recommender.analyze_trends()
+    with profiler.stage('analysis', records_in=analyzer.row_count or None):
+        results = analyzer.run_analysis(mode=execution_mode, workers=workers)
+    if analyzer.df is None:
+        print(f"   Registros processados: {analyzer.row_count}")
+    if analyzer.sketches is not None:
+        analyzer.sketches.report()
     
-    # Criar recomendações
-    serie = recommender.create_serie_recommendation(trends)
-    movie = recommender.create_movie_recommendation(trends)
-    
-    # Justificar escolhas
-    recommender.justify_recommendations(serie, movie, trends)
+    serie = movie = trends = None
+    if recommendations:
+        with profiler.stage('recommendations'):
+            # Inicializar engine de recomendações (no streaming, só com as colunas usadas)
+            recommender = NetflixRecommendationEngine(results, analyzer.load_columns(['type', 'duration']))
+            
+            # Analisar tendências
+            if 'trends' in recommendations:
+                with profiler.stage('trends'):
+                    trends = recommender.analyze_trends()
+            
+            # Criar recomendações
+            if 'serie' in recommendations:
+                with profiler.stage('serie'):
+                    serie = recommender.create_serie_recommendation(trends)
+            if 'movie' in recommendations:
+                with profiler.stage('movie'):
+                    movie = recommender.create_movie_recommendation(trends)
+            
+            # Justificar escolhas
+            if 'justify' in recommendations:
+                with profiler.stage('justify'):
+                    recommender.justify_recommendations(serie, movie, trends)
+            
+            # Tendências por data de adição (date_added)
+            if 'momentum' in recommendations:
+                with profiler.stage('momentum'):
+                    recommender.timeline = CatalogTimeline.from_frame(analyzer.load_columns(CatalogTimeline.COLUMNS))
+                    recommender.analyze_momentum()
     
     # Gerar visualizações
-    visualizer = NetflixVisualization(results, analyzer.df)
-    visualizer.generate_main_charts()
+    if charts:
+        with profiler.stage('visualization'):
+            renderer = ChartRenderer(preview=preview_charts, cache_dir='.netflix_cache' if use_cache else None)
+            visualizer = NetflixVisualization(results, analyzer.df, renderer)
+            if 'main' in charts:
+                with profiler.stage('main'):
+                    visualizer.generate_main_charts()
+            if 'segments' in charts:
+                with profiler.stage('segments'):
+                    visualizer.generate_segment_charts(cube=AggregateCube(results, analyzer.catalog()))
     
     # Simulação Hadoop
     simulate_hadoop_mapreduce()
     
     print(f"\n🎉 ANÁLISE COMPLETA CONCLUÍDA!")
-    print(f"✅ Série 'Conexão Perdida' criada e justificada")
-    print(f"✅ Filme 'Consciência Artificial' criado e justificado")
-    print(f"✅ Gráficos salvos em 'analise_netflix_mapreduce.png'")
+    if serie is not None:
+        print(f"✅ Série 'Conexão Perdida' criada e justificada")
+    if movie is not None:
+        print(f"✅ Filme 'Consciência Artificial' criado e justificado")
+    if 'main' in charts:
+        print(f"✅ Gráficos salvos em '{renderer.output_path('analise_netflix_mapreduce.png')}'")
     print(f"✅ Metodologia MapReduce aplicada com sucesso")
     
+    profiler.stop()
+    if profile_path:
+        profiler.report()
+        profiler.write_json(profile_path)
+        print(f"   Perfil das etapas salvo em '{profile_path}'")
+    
     return serie, movie
 
+def _stage_list(value):
+    # "a,b,c" -> ['a', 'b', 'c']; "none" desliga a etapa
+    return [] if value == 'none' else [item.strip() for item in value.split(',') if item.strip()]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Análise Netflix com MapReduce")
+    parser.add_argument('mode', nargs='?', default='classic',
+                        choices=['classic', 'fused', 'vectorized', 'parallel', 'external', 'approximate', 'serve'],
+                        help="modo de execução do MapReduce, ou 'serve' para o serviço HTTP")
+    parser.add_argument('workers', nargs='?', type=int, default=None, help="workers dos modos parallel e approximate")
+    parser.add_argument('--source', default='netflix_titles.csv', help="CSV ou diretório de snapshot colunar")
+    parser.add_argument('--streaming', action='store_true', help="lê o CSV em chunks")
+    parser.add_argument('--chunksize', type=int, default=10000, help="linhas por chunk no streaming")
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false', help="ignora o cache em disco")
+    parser.add_argument('--memory-budget', type=int, default=256, metavar='MB',
+                        help="memória para pares intermediários no modo external")
+    
+    stages = parser.add_argument_group('etapas')
+    stages.add_argument('--analyses', type=_stage_list, default=None,
+                        help="jobs MapReduce: genres,countries,ratings,years,type_analysis,"
+                             "collaborations,cast,description_tokens")
+    stages.add_argument('--recommendations', type=_stage_list, default=DEFAULT_RECOMMENDATIONS,
+                        help="trends,serie,movie,justify,momentum ou none")
+    stages.add_argument('--charts', type=_stage_list, default=['main'], help="main,segments ou none")
+    stages.add_argument('--segment-charts', action='store_true', help="inclui 'segments' em --charts")
+    stages.add_argument('--preview', action='store_true', help="gráficos em resolução de prévia")
+    stages.add_argument('--top-genres', type=int, nargs='?', const=10, default=None, metavar='K',
+                        help="só imprime os K gêneros mais populares (consulta rápida) e sai")
+    stages.add_argument('--build-snapshot', metavar='DIR', help="converte --source em snapshot colunar e sai")
+    
+    profiling = parser.add_argument_group('perfil')
+    profiling.add_argument('--profile', metavar='PATH', help="grava o perfil das etapas em JSON")
+    profiling.add_argument('--cprofile', metavar='PATH', help="grava o dump do cProfile")
+    profiling.add_argument('--trace-memory', action='store_true', help="pico de memória por etapa (tracemalloc)")
+    
+    service = parser.add_argument_group('serviço (modo serve)')
+    service.add_argument('--host', default='127.0.0.1')
+    service.add_argument('--port', type=int, default=8765)
+    service.add_argument('--poll', type=float, default=5.0, help="segundos entre verificações do CSV")
+    service.add_argument('--mode', dest='serve_mode', default='vectorized', help="modo usado pelo serviço")
+    return parser
+
 if __name__ == "__main__":
-    serie, movie = main()
+    parser = build_parser()
+    arguments = parser.parse_args()
+    for name, selected, allowed in [('--recommendations', arguments.recommendations, RECOMMENDATION_STAGES),
+                                    ('--charts', arguments.charts, CHART_STAGES)]:
+        unknown = set(selected) - set(allowed)
+        if unknown:
+            parser.error(f"{name}: etapas desconhecidas: {', '.join(sorted(unknown))}")
+    
+    if arguments.build_snapshot:
+        # Conversão única do CSV em snapshot colunar
+        CatalogSnapshot.write(arguments.source, arguments.build_snapshot)
+        sys.exit(0)
+    if arguments.top_genres is not None:
+        top_genres(arguments.source, arguments.top_genres)
+        sys.exit(0)
+    if arguments.mode == 'serve':
+        # Serviço HTTP de longa duração com estado em memória e hot reload
+        NetflixAnalysisService(arguments.source, mode=arguments.serve_mode, host=arguments.host,
+                               port=arguments.port, poll_interval=arguments.poll,
+                               use_cache=arguments.use_cache).run()
+        sys.exit(0)
+    
+    charts = arguments.charts + (['segments'] if arguments.segment_charts and 'segments' not in arguments.charts else [])
+    # Só a validação dos argumentos vira erro de uso; erros da execução propagam com traceback
+    try:
+        resolve_jobs(arguments.analyses, arguments.recommendations + charts)
+    except ValueError as error:
+        parser.error(str(error))
+    serie, movie = main(arguments.mode, arguments.workers, streaming=arguments.streaming,
+                        chunksize=arguments.chunksize, use_cache=arguments.use_cache,
+                        source=arguments.source, profile_path=arguments.profile,
+                        cprofile_path=arguments.cprofile, trace_memory=arguments.trace_memory,
+                        preview_charts=arguments.preview, analyses=arguments.analyses,
+                        recommendations=arguments.recommendations, charts=charts,
+                        memory_budget=arguments.memory_budget << 20)